@@ -1,31 +1,67 @@
 from typing import Dict, Any
-from models import Bill
+from models import Bill, Payment
 from db import db
 from datetime import datetime, timedelta
+from sqlalchemy import func
+from currency import conversion_case, get_reporting_currency
 
-def aggregate_user_data(user_id: str, months: int = 12) -> Dict[str, Any]:
+
+def _month_bucket(column):
+    """SQL expression formatting a datetime column as 'YYYY-MM' for the active dialect."""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return func.to_char(column, 'YYYY-MM')
+    if dialect == 'mysql':
+        return func.date_format(column, '%Y-%m')
+    return func.strftime('%Y-%m', column)
+
+
+def aggregate_user_data(user_id: str, months: int = 12, currency: str | None = None) -> Dict[str, Any]:
     """Collect billing data for the user and produce lightweight aggregates.
 
     This function is intentionally deterministic (no LLM). It returns a dict
-    that other agents (LangChain-backed or fallback) can consume.
+    that other agents (LangChain-backed or fallback) can consume. Spend over
+    time comes from the payments ledger via range scans on (user_id, paid_at).
+    All totals are in `currency` (default: the user's reporting currency);
+    each bill dict gains `reporting_amount_cents` in that currency.
     """
     now = datetime.utcnow()
     start = now - timedelta(days=30 * months)
-    bills = Bill.query.filter_by(user_id=user_id).all()
-    bill_list = [b.to_dict() for b in bills]
+    currency = currency or get_reporting_currency(user_id)
+    factor = conversion_case(Bill.currency, currency)
+    tag = func.coalesce(func.nullif(Bill.tag, ''), 'other')
+    active = (Bill.user_id == user_id, Bill.active.isnot(False))
+    # conversion happens in SQL, one CASE factor per currency rather than per bill
+    bill_list = []
+    for b, reporting_cents in db.session.query(Bill, Bill.amount_cents * factor).filter(*active).all():
+        d = b.to_dict()
+        d['reporting_amount_cents'] = int(round(reporting_cents or 0))
+        bill_list.append(d)
 
-    total_cents = sum(b.amount_cents for b in bills) if bills else 0
-    by_tag = {}
-    for b in bills:
-        tag = b.tag or 'other'
-        by_tag.setdefault(tag, 0)
-        by_tag[tag] += (b.amount_cents or 0)
+    by_tag = {label: int(round(cents or 0)) for label, cents in db.session.query(tag, func.sum(Bill.amount_cents * factor)).filter(*active).group_by(tag).all()}
+    total_cents = sum(by_tag.values())
 
     # simple top bills
-    top_bills = sorted(bill_list, key=lambda x: x.get('amount_cents', 0), reverse=True)[:5]
+    top_bills = sorted(bill_list, key=lambda x: x.get('reporting_amount_cents', 0), reverse=True)[:5]
+
+    window_start = datetime(start.year, start.month, 1)
+    in_window = (Payment.user_id == user_id, Payment.paid_at >= window_start, Payment.paid_at <= now)
+    # payments take their bill's currency; conversion happens inside the aggregate
+    paid = func.sum(Payment.amount_cents * factor)
+    month = _month_bucket(Payment.paid_at)
+    monthly_paid = {}
+    monthly_paid_counts = {}
+    for label, cents, n in db.session.query(month, paid, func.count(Payment.id)).join(Bill, Payment.bill_id == Bill.id).filter(*in_window).group_by(month).all():
+        monthly_paid[label] = int(round(cents or 0))
+        monthly_paid_counts[label] = int(n or 0)
+    paid_before_cents = db.session.query(paid).join(Bill, Payment.bill_id == Bill.id).filter(Payment.user_id == user_id, Payment.paid_at < window_start).scalar() or 0
+    paid_by_tag = {}
+    for label, cents in db.session.query(tag, paid).join(Bill, Payment.bill_id == Bill.id).filter(*in_window).group_by(tag).all():
+        paid_by_tag[label] = int(round(cents or 0))
 
     return {
         'user_id': user_id,
+        'currency': currency,
         'months': months,
         'start': start.isoformat(),
         'end': now.isoformat(),
@@ -33,4 +69,8 @@ def aggregate_user_data(user_id: str, months: int = 12) -> Dict[str, Any]:
         'by_tag_cents': by_tag,
         'top_bills': top_bills,
         'bills': bill_list,
+        'monthly_paid_cents': monthly_paid,
+        'monthly_paid_counts': monthly_paid_counts,
+        'paid_before_cents': int(round(paid_before_cents)),
+        'paid_by_tag_cents': paid_by_tag,
     }
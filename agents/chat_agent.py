@@ -1,15 +1,18 @@
 import os
 import json
 import hashlib
+import time
 from datetime import datetime, timedelta
 
-from db import db
-from models import Bill, User, AgentResult
+from db import db, replica_reads
+from models import Bill, User, AgentResult, get_data_version, save_agent_result
+from metrics import chat_cache_total, observe_llm_call
+from currency import converter, get_reporting_currency
 
 
-def _make_cache_key(user_id, message, context_obj):
+def _make_cache_key(user_id, message, data_version):
     h = hashlib.sha256()
-    key_material = f"{user_id}|{message}|{json.dumps(context_obj, sort_keys=True, default=str)}"
+    key_material = f"{user_id}|{data_version}|{message}"
     h.update(key_material.encode('utf-8'))
     return h.hexdigest()
 
@@ -29,10 +32,9 @@ def _load_from_cache(cache_key, user_id, ttl_seconds: int):
     return payload
 
 
-def _save_to_cache(cache_key, user_id, payload_obj):
+def _save_to_cache(cache_key, user_id, payload_obj, data_version=None):
     agent_key = f"chat_agent_v1:{cache_key}"
-    row = AgentResult(agent_key=agent_key, user_id=user_id, payload=json.dumps(payload_obj, default=str))
-    db.session.add(row)
+    save_agent_result(agent_key, user_id, json.dumps(payload_obj, default=str), data_version)
     try:
         db.session.commit()
     except Exception:
@@ -42,22 +44,40 @@ def _save_to_cache(cache_key, user_id, payload_obj):
 def generate_chat_response(user_id: str | None, message: str, use_cache: bool = True) -> dict:
     """Generate a chat response for a specific user. Returns a dict {text, model, cached}.
 
-    Caching: uses `AgentResult` rows with agent_key `chat_agent_v1:<cache_key>`. TTL controlled by env CHAT_CACHE_TTL_SECONDS (default 300s)."""
+    Caching: uses `AgentResult` rows with agent_key `chat_agent_v1:<cache_key>`, where the key covers the
+    user's data_version so bill edits make old entries unreachable. TTL controlled by env CHAT_CACHE_TTL_SECONDS (default 300s)."""
+    cache_ttl = int(os.environ.get('CHAT_CACHE_TTL_SECONDS') or os.environ.get('CHAT_CACHE_TTL') or 300)
+    data_version = get_data_version(user_id)
+    cache_key = _make_cache_key(user_id or 'anon', message, data_version)
+
+    if use_cache:
+        cached = _load_from_cache(cache_key, user_id or 'anon', cache_ttl)
+        if cached:
+            chat_cache_total.inc('hit')
+            cached['cached'] = True
+            return cached
+        chat_cache_total.inc('miss')
+
     # build context
     context = {}
     try:
         if user_id:
-            bills = Bill.query.filter_by(user_id=user_id).order_by(Bill.created_at.desc()).limit(200).all()
+            currency = get_reporting_currency(user_id)
+            convert = converter(currency)
+            with replica_reads(user_id, data_version):
+                bills = Bill.query.filter_by(user_id=user_id).filter(Bill.active.isnot(False)).order_by(Bill.created_at.desc()).limit(200).all()
             bill_dicts = [b.to_dict() for b in bills]
-            total_cents = sum((b.amount_cents or 0) for b in bills)
+            amounts = [convert(b.amount_cents, b.currency) for b in bills]
+            total_cents = sum(amounts)
             monthly_estimate = 0
-            for b in bills:
+            for b, amt in zip(bills, amounts):
                 if b.period == 'monthly' or b.period is None:
-                    monthly_estimate += (b.amount_cents or 0)
+                    monthly_estimate += amt
                 elif b.period == 'yearly':
-                    monthly_estimate += (b.amount_cents or 0) / 12.0
+                    monthly_estimate += amt / 12.0
             context = {
                 'user': {'id': user_id},
+                'currency': currency,
                 'bills': bill_dicts,
                 'total_amount_cents': int(total_cents),
                 'monthly_estimate_cents': int(monthly_estimate),
@@ -65,22 +85,15 @@ def generate_chat_response(user_id: str | None, message: str, use_cache: bool =
     except Exception:
         context = {}
 
-    cache_ttl = int(os.environ.get('CHAT_CACHE_TTL_SECONDS') or os.environ.get('CHAT_CACHE_TTL') or 300)
-    cache_key = _make_cache_key(user_id or 'anon', message, context)
-
-    if use_cache:
-        cached = _load_from_cache(cache_key, user_id or 'anon', cache_ttl)
-        if cached:
-            cached['cached'] = True
-            return cached
-
     # call Gemini via google.genai
     from google import genai
     # Prefer explicit API key to avoid ambiguous client initialization errors
     api_key = os.environ.get('GEMINI_API_KEY') or os.environ.get('GOOGLE_GENAI_API_KEY') or os.environ.get('GENAI_API_KEY')
     if not api_key:
         raise RuntimeError('GEMINI_API_KEY is not set in environment. Set GEMINI_API_KEY in .env or environment before calling the chat agent.')
-    client = genai.Client(api_key=api_key)
+    # GEMINI_BASE_URL points the client at another endpoint, e.g. loadtest/fake_genai.py
+    base_url = os.environ.get('GEMINI_BASE_URL')
+    client = genai.Client(api_key=api_key, http_options={'base_url': base_url}) if base_url else genai.Client(api_key=api_key)
     model = os.environ.get('GEMINI_MODEL') or os.environ.get('GEMINI_MODEL_NAME') or 'gemini-2.5-flash'
 
     system_instructions = (
@@ -90,17 +103,20 @@ def generate_chat_response(user_id: str | None, message: str, use_cache: bool =
     )
     contents = system_instructions + "\n\nContext JSON:\n" + json.dumps(context, default=str) + "\n\nUser question:\n" + message + "\n\nAnswer in Markdown."
 
+    started = time.perf_counter()
     try:
         response = client.models.generate_content(model=model, contents=contents)
     except Exception as e:
+        observe_llm_call(model, time.perf_counter() - started, error=True)
         # surface provider errors with context
         raise RuntimeError(f'GenAI provider error: {e}') from e
+    observe_llm_call(model, time.perf_counter() - started, response)
     text = getattr(response, 'text', None) or str(response)
     out = {'text': text, 'model': model, 'cached': False}
 
     # persist to cache
     try:
-        _save_to_cache(cache_key, user_id or 'anon', out)
+        _save_to_cache(cache_key, user_id or 'anon', out, data_version)
     except Exception:
         pass
 
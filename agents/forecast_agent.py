@@ -0,0 +1,131 @@
+from typing import Dict, Any, List
+from datetime import datetime
+import json
+
+from db import db, replica_reads
+from models import Bill, AgentResult, get_data_version, period_step, save_agent_result, versioned_key
+from currency import converter, get_reporting_currency
+
+ALLOWED_HORIZONS = (3, 6, 12)
+
+
+def _month_index(dt: datetime) -> int:
+    return dt.year * 12 + dt.month - 1
+
+
+def _month_label(idx: int) -> str:
+    return f'{idx // 12:04d}-{idx % 12 + 1:02d}'
+
+
+def _bill_step(bill: Dict[str, Any]):
+    """Return ('months'|'days', step) for a recurring bill, or None for one-time bills."""
+    return period_step(bill.get('period'), bill.get('interval_count'), bill.get('interval_unit'))
+
+
+def project_bills(bills: List[Dict[str, Any]], today: datetime, months: int) -> Dict[str, Any]:
+    """Expand recurring bills into per-month projected totals over `months` months.
+
+    Schedules are expanded arithmetically on month indexes or day ordinals
+    (no per-occurrence date stepping), so hundreds of bills over a year cost
+    a few thousand integer operations. `bills` are plain dicts with
+    amount_cents, tag, period, interval_count, interval_unit and an anchor
+    date (next_due, else last_paid, else created_at).
+    """
+    start_idx = _month_index(today)
+    end_idx = start_idx + months
+    horizon_end = datetime(end_idx // 12, end_idx % 12 + 1, 1)
+    today = datetime(today.year, today.month, today.day)
+    # day ordinals of today and of each following month start, for day-based schedules
+    bounds = [today.toordinal()] + [datetime(i // 12, i % 12 + 1, 1).toordinal() for i in range(start_idx + 1, end_idx + 1)]
+    totals = [0] * months
+    by_tag: Dict[str, List[int]] = {}
+    occurrences = 0
+    for b in bills:
+        if b.get('active') is False:
+            continue
+        anchor = b.get('next_due') or b.get('last_paid') or b.get('created_at')
+        amount = int(b.get('amount_cents') or 0)
+        if not anchor or not amount:
+            continue
+        tag_row = by_tag.get(b.get('tag') or 'other')
+        if tag_row is None:
+            tag_row = by_tag[b.get('tag') or 'other'] = [0] * months
+        step = _bill_step(b)
+        if step is None:
+            slots = [_month_index(anchor) - start_idx] if today <= anchor < horizon_end else []
+        elif step[0] == 'months':
+            m0, n = _month_index(anchor), step[1]
+            k = max(0, -(-(start_idx - m0) // n))
+            # an occurrence earlier this month is already past; stepped occurrences fall on the day clamped to 28
+            if m0 + k * n == start_idx and (anchor.day if k == 0 else min(anchor.day, 28)) < today.day:
+                k += 1
+            slots = range(m0 + k * n - start_idx, months, n)
+        else:
+            # day-based: count occurrences before each month boundary on day ordinals
+            n = step[1]
+            first = anchor.toordinal() + max(0, -(-(today.toordinal() - anchor.toordinal()) // n)) * n
+            before = [max(0, -(-(bound - first) // n)) for bound in bounds]
+            for slot in range(months):
+                hits = before[slot + 1] - before[slot]
+                if hits:
+                    totals[slot] += amount * hits
+                    tag_row[slot] += amount * hits
+                    occurrences += hits
+            continue
+        for slot in slots:
+            totals[slot] += amount
+            tag_row[slot] += amount
+            occurrences += 1
+    return {
+        'horizon_months': months,
+        'labels': [_month_label(i) for i in range(start_idx, end_idx)],
+        'totals_cents': totals,
+        'by_tag_cents': {tag: row for tag, row in by_tag.items() if any(row)},
+        'occurrences': occurrences,
+    }
+
+
+def prepare_forecast_chart(forecast: Dict[str, Any]) -> Dict[str, Any]:
+    """Stacked Chart.js bar config of projected obligations per tag."""
+    palette = ['#60A5FA', '#34D399', '#FBBF24', '#F87171', '#A78BFA', '#F472B6', '#22D3EE', '#A3E635']
+    datasets = []
+    for i, (tag, row) in enumerate(sorted(forecast.get('by_tag_cents', {}).items())):
+        datasets.append({'label': tag, 'data': [v / 100.0 for v in row], 'backgroundColor': palette[i % len(palette)], 'stack': 'forecast'})
+    return {
+        'type': 'bar',
+        'data': {'labels': forecast.get('labels', []), 'datasets': datasets},
+        'options': {'responsive': True, 'maintainAspectRatio': False, 'scales': {'x': {'stacked': True}, 'y': {'stacked': True}}}
+    }
+
+
+def forecast_user_bills(user_id: str, months: int = 6) -> Dict[str, Any]:
+    """Return the projected obligations for a user, cached per data_version and day."""
+    now = datetime.utcnow()
+    data_version = get_data_version(user_id)
+    agent_key = versioned_key(f'forecast_agent_v1:{months}:{now.date().isoformat()}', data_version)
+    row = AgentResult.query.filter_by(agent_key=agent_key, user_id=user_id).order_by(AgentResult.created_at.desc()).first()
+    if row:
+        try:
+            return json.loads(row.payload)
+        except Exception:
+            pass
+    currency = get_reporting_currency(user_id)
+    convert = converter(currency)
+    with replica_reads(user_id, data_version):
+        bills = db.session.query(Bill.amount_cents, Bill.currency, Bill.tag, Bill.period, Bill.interval_count, Bill.interval_unit, Bill.active, Bill.next_due, Bill.last_paid, Bill.created_at).filter(Bill.user_id == user_id).all()
+    bill_dicts = []
+    for b in bills:
+        d = b._asdict()
+        d['amount_cents'] = convert(d['amount_cents'], d['currency'])
+        bill_dicts.append(d)
+    forecast = project_bills(bill_dicts, now, months)
+    forecast['currency'] = currency
+    forecast['as_of'] = now.date().isoformat()
+    forecast['data_version'] = data_version
+    forecast['chart'] = prepare_forecast_chart(forecast)
+    try:
+        save_agent_result(agent_key, user_id, json.dumps(forecast, default=str), data_version)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+    return forecast
@@ -13,6 +13,12 @@ def _month_label(dt: datetime):
     return dt.strftime('%Y-%m')
 
 
+def _amount_cents(b: Dict[str, Any]) -> int:
+    """Bill amount in the aggregate's reporting currency when available."""
+    amt = b.get('reporting_amount_cents')
+    return (b.get('amount_cents', 0) if amt is None else amt) or 0
+
+
 def prepare_all(agg: Dict[str, Any]) -> Dict[str, Any]:
     """Prepare Chart.js-compatible configs and raw aggregates.
 
@@ -29,7 +35,7 @@ def prepare_all(agg: Dict[str, Any]) -> Dict[str, Any]:
     """
     try:
         bills = agg.get('bills', []) or []
-        # build monthly buckets by created_at
+        # build monthly buckets; bill creations are counted by created_at
         start = _parse_iso(agg.get('start'))
         end = _parse_iso(agg.get('end'))
         months = []
@@ -52,17 +58,26 @@ def prepare_all(agg: Dict[str, Any]) -> Dict[str, Any]:
             except Exception:
                 dt = None
             label = _month_label(dt) if dt else None
-            amt = (b.get('amount_cents', 0) or 0) / 100.0
+            amt = _amount_cents(b) / 100.0
             if label and label in monthly_totals:
                 monthly_totals[label] += amt
                 monthly_counts[label] += 1
 
+        # spend comes from the payments ledger when the aggregate carries it
+        created_counts = dict(monthly_counts)
+        monthly_paid = agg.get('monthly_paid_cents')
+        if monthly_paid is not None:
+            monthly_totals = {m: (monthly_paid.get(m, 0) or 0) / 100.0 for m in months}
+            paid_counts = agg.get('monthly_paid_counts') or {}
+            monthly_counts = {m: paid_counts.get(m, 0) or 0 for m in months}
+
         labels = months
         data = [monthly_totals.get(m, 0.0) for m in labels]
+        # counts match `data` (payments when ledger-backed) so data / counts is an average payment
         counts = [monthly_counts.get(m, 0) for m in labels]
 
-        # tag breakdown
-        by_tag = agg.get('by_tag_cents', {}) or {}
+        # tag breakdown: paid amounts in the window, falling back to bill amounts before any payment exists
+        by_tag = agg.get('paid_by_tag_cents') or agg.get('by_tag_cents', {}) or {}
         tag_labels = list(by_tag.keys())
         tag_values = [v / 100.0 for v in by_tag.values()]
 
@@ -71,7 +86,7 @@ def prepare_all(agg: Dict[str, Any]) -> Dict[str, Any]:
         for b in bills:
             pm = b.get('payment_mode') or 'other'
             pm_map.setdefault(pm, 0.0)
-            pm_map[pm] += (b.get('amount_cents', 0) or 0) / 100.0
+            pm_map[pm] += _amount_cents(b) / 100.0
         pm_labels = list(pm_map.keys())
         pm_values = [pm_map[k] for k in pm_labels]
 
@@ -83,7 +98,7 @@ def prepare_all(agg: Dict[str, Any]) -> Dict[str, Any]:
                     'id': b.get('id'),
                     'name': b.get('name'),
                     'due_date': b.get('next_due'),
-                    'amount': (b.get('amount_cents', 0) or 0) / 100.0,
+                    'amount': _amount_cents(b) / 100.0,
                     'tag': b.get('tag'),
                     'payment_mode': b.get('payment_mode')
                 })
@@ -94,7 +109,8 @@ def prepare_all(agg: Dict[str, Any]) -> Dict[str, Any]:
             'by_tag_cents': by_tag,
             'payment_modes': pm_map,
             'top_bills': agg.get('top_bills', []),
-            'total_cents': agg.get('total_cents', 0)
+            'total_cents': agg.get('total_cents', 0),
+            'currency': agg.get('currency')
         }
 
         # Chart.js configs
@@ -114,7 +130,7 @@ def prepare_all(agg: Dict[str, Any]) -> Dict[str, Any]:
         }
 
         cumulative = []
-        running = 0.0
+        running = (agg.get('paid_before_cents', 0) or 0) / 100.0
         for v in data:
             running += v
             cumulative.append(running)
@@ -149,7 +165,7 @@ def prepare_all(agg: Dict[str, Any]) -> Dict[str, Any]:
             'type': 'bar',
             'data': {
                 'labels': labels,
-                'datasets': [{'label': 'Bills created', 'data': counts, 'backgroundColor': '#C084FC'}]
+                'datasets': [{'label': 'Bills created', 'data': [created_counts.get(m, 0) for m in labels], 'backgroundColor': '#C084FC'}]
             },
             'options': {'responsive': True, 'maintainAspectRatio': False}
         }
@@ -161,6 +177,7 @@ def prepare_all(agg: Dict[str, Any]) -> Dict[str, Any]:
             'payment_mode': payment_mode,
             'created_history': created_history,
             'upcoming_timeline': upcoming,
+            'currency': agg.get('currency'),
             'raw': raw,
         }
     except Exception:
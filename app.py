@@ -1,10 +1,16 @@
 import os
 from flask import Flask, render_template, request, redirect, url_for, session, flash, Response, jsonify
 from dotenv import load_dotenv
-from db import init_db, db
+from db import init_db, db, replica_reads
+from metrics import init_metrics
+from assets import init_assets
+from scheduler import ensure_default_agents, init_scheduler, latest_reminders, seed_default_agents
+from purge import start_background_purge, start_purge_worker
+from currency import SYMBOLS, converter, format_amount, load_rates_file, supported_currencies, validate_currency
 from werkzeug.security import generate_password_hash, check_password_hash
-from models import User, Bill, seed_defaults, AgentResult
-from datetime import datetime
+from models import User, Bill, Payment, seed_defaults, AgentResult, Agent, AccountPurge, bump_data_version, period_step, save_agent_result, get_data_version, versioned_key
+from datetime import datetime, timedelta
+import click
 import csv
 import io
 import json
@@ -12,6 +18,22 @@ from sqlalchemy import inspect, text
 from sqlalchemy.exc import OperationalError
 from threading import Thread
 
+def _step_period(cur, period, interval_count=1, interval_unit=None):
+    """Return `cur` moved forward by one billing period, or None for one-time bills."""
+    step = period_step(period, interval_count, interval_unit)
+    if step is None:
+        return None
+    unit, n = step
+    if unit == 'days':
+        return cur + timedelta(days=n)
+    if period == 'yearly':
+        try:
+            return cur.replace(year=cur.year + n // 12)
+        except Exception:
+            return cur.replace(day=min(cur.day, 28), year=cur.year + n // 12)
+    month = cur.month - 1 + n
+    return cur.replace(year=cur.year + month // 12, month=month % 12 + 1, day=min(cur.day, 28))
+
 def _compute_next_due_from(start_date, period, interval_count=1):
     if not start_date:
         return None
@@ -25,33 +47,34 @@ def _compute_next_due_from(start_date, period, interval_count=1):
     if period == 'one-time' or not period:
         return cur if cur >= now else None
     while cur < now and i < max_iterations:
-        if period == 'monthly':
-            month = cur.month - 1 + interval_count
-            year = cur.year + month // 12
-            month = month % 12 + 1
-            day = min(cur.day, 28)
-            try:
-                cur = cur.replace(year=year, month=month, day=day)
-            except Exception:
-                cur = cur.replace(day=1)
-                if month == 12:
-                    cur = cur.replace(year=year + 1, month=1)
-                else:
-                    cur = cur.replace(month=month)
-        elif period == 'yearly':
-            try:
-                cur = cur.replace(year=cur.year + interval_count)
-            except Exception:
-                cur = cur.replace(month=cur.month, day=min(cur.day, 28), year=cur.year + interval_count)
-        else:
+        cur = _step_period(cur, period, interval_count)
+        if cur is None:
             return None
         i += 1
     return cur if cur >= now else None
 
+def _advance_due_after_payment(bill, paid_at):
+    """Next due date after a payment at `paid_at`.
+
+    The due date moves one period only when the payment settles it, i.e. was
+    made no earlier than one period before it. Older back-dated payments
+    leave the schedule alone.
+    """
+    stepped = _step_period(paid_at, bill.period, bill.interval_count or 1, bill.interval_unit)
+    if bill.next_due is None or stepped is None:
+        return stepped
+    if stepped < bill.next_due:
+        return bill.next_due
+    return _step_period(bill.next_due, bill.period, bill.interval_count or 1, bill.interval_unit)
+
 load_dotenv()
 app = Flask(__name__, static_folder='static', template_folder='templates')
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'dev-secret')
 init_db(app)
+init_metrics(app)
+init_assets(app)
+init_scheduler(app)
+start_purge_worker(app)
 
 
 @app.route('/api/overview/trigger-refresh', methods=['POST'])
@@ -65,23 +88,19 @@ def get_current_user():
     user_id = session.get('user_id')
     if not user_id:
         return None
-    return User.query.get(user_id)
+    return User.query.filter_by(id=user_id, deleted_at=None).first()
 
 
-def invalidate_chat_cache_for_user(user_id: str | None):
-    """Delete cached chat AgentResult rows for a given user.
+@app.template_filter('money')
+def money_filter(cents, currency=None):
+    return format_amount(cents, currency)
 
-    This removes any AgentResult rows whose agent_key starts with 'chat_agent_v1:' for the user.
-    """
-    if not user_id:
-        return
-    try:
-        # use SQLAlchemy query delete for efficiency
-        AgentResult.query.filter(AgentResult.user_id == user_id, AgentResult.agent_key.like('chat_agent_v1:%')).delete(synchronize_session=False)
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
-        return
+@app.cli.command('load-rates')
+@click.argument('path')
+def load_rates_command(path):
+    """Load exchange rates from a local JSON file."""
+    changed = load_rates_file(path)
+    click.echo(f'{changed} exchange rates updated from {path}')
 
 @app.route('/')
 def index():
@@ -100,6 +119,8 @@ def signup():
         return redirect(url_for('index'))
     user = User(email=email, password_hash=generate_password_hash(password))
     db.session.add(user)
+    db.session.flush()
+    ensure_default_agents(user.id)
     db.session.commit()
     session['user_id'] = user.id
     flash('Account created. Welcome!', 'success')
@@ -167,16 +188,19 @@ def api_chat_context():
     if not user:
         return jsonify({'user': None, 'bills': [], 'total_amount_cents': 0, 'monthly_estimate_cents': 0, 'num_bills': 0})
     try:
-        bills = Bill.query.filter_by(user_id=user.id).order_by(Bill.created_at.desc()).limit(50).all()
+        with replica_reads(user.id, user.data_version):
+            bills = Bill.query.filter_by(user_id=user.id).filter(Bill.active.isnot(False)).order_by(Bill.created_at.desc()).limit(50).all()
         bill_dicts = [b.to_dict() for b in bills]
-        total_cents = sum((b.amount_cents or 0) for b in bills)
+        convert = converter(user.reporting_currency)
+        amounts = [convert(b.amount_cents, b.currency) for b in bills]
+        total_cents = sum(amounts)
         monthly_estimate = 0
-        for b in bills:
+        for b, amt in zip(bills, amounts):
             if b.period == 'monthly' or b.period is None:
-                monthly_estimate += (b.amount_cents or 0)
+                monthly_estimate += amt
             elif b.period == 'yearly':
-                monthly_estimate += (b.amount_cents or 0) / 12.0
-        return jsonify({'user': {'id': user.id, 'email': user.email}, 'bills': bill_dicts, 'total_amount_cents': int(total_cents), 'monthly_estimate_cents': int(monthly_estimate), 'num_bills': len(bill_dicts)})
+                monthly_estimate += amt / 12.0
+        return jsonify({'user': {'id': user.id, 'email': user.email}, 'currency': user.reporting_currency, 'bills': bill_dicts, 'total_amount_cents': int(total_cents), 'monthly_estimate_cents': int(monthly_estimate), 'num_bills': len(bill_dicts)})
     except Exception as e:
         return (jsonify({'error': str(e)}), 500)
 
@@ -185,7 +209,7 @@ def bills():
     user = get_current_user()
     if not user:
         return redirect(url_for('index'))
-    bills = Bill.query.filter_by(user_id=user.id).order_by(Bill.next_due.asc().nulls_last()).all()
+    bills = Bill.query.filter_by(user_id=user.id).filter(Bill.active.isnot(False)).order_by(Bill.next_due.asc().nulls_last()).all()
     now = datetime.utcnow()
     for b in bills:
         try:
@@ -202,7 +226,7 @@ def bills():
                     b.next_due = computed
         except Exception:
             continue
-    return render_template('bills.html', bills=bills)
+    return render_template('bills.html', bills=bills, currencies=supported_currencies(), currency_symbols=SYMBOLS, reporting_currency=user.reporting_currency)
 
 @app.route('/bills/create', methods=['POST'])
 def create_bill():
@@ -216,6 +240,10 @@ def create_bill():
     amount = request.form.get('amount')
     period = request.form.get('period')
     first_payment_date = request.form.get('first_payment_date')
+    currency = validate_currency(request.form.get('currency'))
+    if currency is None:
+        flash('Unsupported currency.', 'error')
+        return redirect(url_for('bills'))
     try:
         amount_cents = int(float(amount) * 100)
     except Exception:
@@ -228,15 +256,14 @@ def create_bill():
             next_due = _compute_next_due_from(last_paid, period, interval_count=1)
         except Exception:
             last_paid = None
-    bill = Bill(user_id=user.id, name=name, description=description, tag=tag, payment_mode=payment_mode, amount_cents=amount_cents, period=period, last_paid=last_paid, next_due=next_due, due_date=next_due)
+    bill = Bill(user_id=user.id, name=name, description=description, tag=tag, payment_mode=payment_mode, amount_cents=amount_cents, currency=currency, period=period, last_paid=last_paid, next_due=next_due, due_date=next_due)
     db.session.add(bill)
+    if last_paid and last_paid <= datetime.utcnow():
+        db.session.flush()
+        db.session.add(Payment(bill_id=bill.id, user_id=user.id, paid_at=last_paid, amount_cents=amount_cents))
+    bump_data_version(user.id)
     db.session.commit()
     flash('Bill created.', 'success')
-    # Invalidate chat cache for this user so assistant uses fresh data
-    try:
-        invalidate_chat_cache_for_user(user.id)
-    except Exception:
-        pass
     return redirect(url_for('bills'))
 
 @app.route('/bills/<bill_id>/edit', methods=['POST'])
@@ -244,7 +271,7 @@ def edit_bill(bill_id):
     user = get_current_user()
     if not user:
         return redirect(url_for('index'))
-    bill = Bill.query.filter_by(id=bill_id, user_id=user.id).first()
+    bill = Bill.query.filter_by(id=bill_id, user_id=user.id).filter(Bill.active.isnot(False)).first()
     if not bill:
         flash('Bill not found.', 'error')
         return redirect(url_for('bills'))
@@ -255,6 +282,10 @@ def edit_bill(bill_id):
     amount = request.form.get('amount')
     period = request.form.get('period')
     first_payment_date = request.form.get('first_payment_date')
+    currency = validate_currency(request.form.get('currency'), default=bill.currency)
+    if currency is None:
+        flash('Unsupported currency.', 'error')
+        return redirect(url_for('bills'))
     try:
         amount_cents = int(float(amount) * 100)
     except Exception:
@@ -272,17 +303,14 @@ def edit_bill(bill_id):
     bill.tag = tag
     bill.payment_mode = payment_mode
     bill.amount_cents = amount_cents
+    bill.currency = currency
     bill.period = period
     bill.last_paid = last_paid
     bill.next_due = next_due
     bill.due_date = next_due
+    bump_data_version(user.id)
     db.session.commit()
     flash('Bill updated.', 'success')
-    # Invalidate chat cache for this user
-    try:
-        invalidate_chat_cache_for_user(user.id)
-    except Exception:
-        pass
     return redirect(url_for('bills'))
 
 @app.route('/bills/<bill_id>/delete', methods=['POST'])
@@ -290,20 +318,58 @@ def delete_bill(bill_id):
     user = get_current_user()
     if not user:
         return redirect(url_for('index'))
-    bill = Bill.query.filter_by(id=bill_id, user_id=user.id).first()
+    bill = Bill.query.filter_by(id=bill_id, user_id=user.id).filter(Bill.active.isnot(False)).first()
     if not bill:
         flash('Bill not found.', 'error')
         return redirect(url_for('bills'))
-    db.session.delete(bill)
+    # bills are deactivated rather than deleted so their payments stay in the ledger
+    bill.active = False
+    bill.next_due = None
+    bill.due_date = None
+    Agent.query.filter_by(bill_id=bill.id).update({'enabled': False, 'next_run_at': None}, synchronize_session=False)
+    bump_data_version(user.id)
     db.session.commit()
     flash('Bill deleted.', 'success')
-    # Invalidate chat cache for this user
-    try:
-        invalidate_chat_cache_for_user(user.id)
-    except Exception:
-        pass
     return redirect(url_for('bills'))
 
+@app.route('/api/bills/<bill_id>/pay', methods=['POST'])
+def api_mark_bill_paid(bill_id):
+    """Record a payment in the ledger and advance the bill's next due date.
+
+    Accepts optional JSON `paid_at` (ISO date/datetime, default now, not in
+    the future) and `amount` (defaults to the bill amount).
+    """
+    user = get_current_user()
+    if not user:
+        return (jsonify({'error': 'authentication required'}), 401)
+    bill = Bill.query.filter_by(id=bill_id, user_id=user.id).filter(Bill.active.isnot(False)).first()
+    if not bill:
+        return (jsonify({'error': 'bill not found'}), 404)
+    data = request.get_json(silent=True) or {}
+    paid_at = datetime.utcnow()
+    if data.get('paid_at'):
+        try:
+            paid_at = datetime.fromisoformat(data['paid_at'])
+        except Exception:
+            return (jsonify({'error': 'paid_at must be an ISO date'}), 400)
+        if paid_at > datetime.utcnow():
+            return (jsonify({'error': 'paid_at cannot be in the future'}), 400)
+    amount_cents = bill.amount_cents or 0
+    if data.get('amount') is not None:
+        try:
+            amount_cents = int(float(data['amount']) * 100)
+        except Exception:
+            return (jsonify({'error': 'amount must be a number'}), 400)
+    payment = Payment(bill_id=bill.id, user_id=user.id, paid_at=paid_at, amount_cents=amount_cents)
+    db.session.add(payment)
+    next_due = _advance_due_after_payment(bill, paid_at)
+    bill.last_paid = max(bill.last_paid, paid_at) if bill.last_paid else paid_at
+    bill.next_due = next_due
+    bill.due_date = next_due
+    bump_data_version(user.id)
+    db.session.commit()
+    return (jsonify({'payment': payment.to_dict(), 'bill': bill.to_dict()}), 201)
+
 @app.route('/profile')
 def profile():
     user = get_current_user()
@@ -335,6 +401,23 @@ def update_profile():
     flash('Profile updated successfully.', 'success')
     return redirect(url_for('profile'))
 
+@app.route('/reporting-currency', methods=['POST'])
+def update_reporting_currency():
+    user = get_current_user()
+    if not user:
+        return redirect(url_for('index'))
+    currency = validate_currency(request.form.get('reporting_currency'), default=user.reporting_currency)
+    if currency is None:
+        flash('Unsupported currency.', 'error')
+        return redirect(url_for('bills'))
+    if currency != user.reporting_currency:
+        user.reporting_currency = currency
+        # every cached total is in the old currency
+        bump_data_version(user.id)
+        db.session.commit()
+        flash(f'Totals are now reported in {currency}.', 'success')
+    return redirect(url_for('bills'))
+
 @app.route('/settings')
 def settings():
     user = get_current_user()
@@ -347,12 +430,13 @@ def export_data():
     user = get_current_user()
     if not user:
         return redirect(url_for('index'))
-    bills = Bill.query.filter_by(user_id=user.id).all()
+    bills = Bill.query.filter_by(user_id=user.id).filter(Bill.active.isnot(False)).all()
     output = io.StringIO()
     writer = csv.writer(output)
-    writer.writerow(['Name', 'Description', 'Tag', 'Payment Mode', 'Amount', 'Period', 'Last Paid', 'Next Due', 'Created At'])
+    convert = converter(user.reporting_currency)
+    writer.writerow(['Name', 'Description', 'Tag', 'Payment Mode', 'Amount', 'Currency', f'Amount ({user.reporting_currency})', 'Period', 'Last Paid', 'Next Due', 'Created At'])
     for bill in bills:
-        writer.writerow([bill.name, bill.description or '', bill.tag or '', bill.payment_mode or '', f'₹{bill.amount_cents / 100:.2f}', bill.period or '', bill.last_paid.strftime('%Y-%m-%d') if bill.last_paid else '', bill.next_due.strftime('%Y-%m-%d') if bill.next_due else '', bill.created_at.strftime('%Y-%m-%d %H:%M:%S')])
+        writer.writerow([bill.name, bill.description or '', bill.tag or '', bill.payment_mode or '', format_amount(bill.amount_cents, bill.currency), bill.currency or '', format_amount(convert(bill.amount_cents, bill.currency), user.reporting_currency), bill.period or '', bill.last_paid.strftime('%Y-%m-%d') if bill.last_paid else '', bill.next_due.strftime('%Y-%m-%d') if bill.next_due else '', bill.created_at.strftime('%Y-%m-%d %H:%M:%S')])
     output.seek(0)
     return Response(output.getvalue(), mimetype='text/csv', headers={'Content-Disposition': f"attachment; filename=billbot_data_{datetime.now().strftime('%Y%m%d')}.csv"})
 
@@ -361,8 +445,10 @@ def api_overview_data():
     user = get_current_user()
     if not user:
         return (jsonify({'error': 'authentication required'}), 401)
-    vp_row = AgentResult.query.filter_by(agent_key='visual_prep_agent_v1', user_id=user.id).order_by(AgentResult.created_at.desc()).first()
-    n_row = AgentResult.query.filter_by(agent_key='narration_agent_v1', user_id=user.id).order_by(AgentResult.created_at.desc()).first()
+    data_version = get_data_version(user.id)
+    with replica_reads(user.id, data_version):
+        vp_row = AgentResult.query.filter_by(agent_key=versioned_key('visual_prep_agent_v1', data_version), user_id=user.id).order_by(AgentResult.created_at.desc()).first()
+        n_row = AgentResult.query.filter_by(agent_key=versioned_key('narration_agent_v1', data_version), user_id=user.id).order_by(AgentResult.created_at.desc()).first()
     charts = None
     narration = None
     try:
@@ -375,30 +461,60 @@ def api_overview_data():
             narration = json.loads(n_row.payload)
     except Exception:
         narration = None
-    latest_bill = Bill.query.filter_by(user_id=user.id).order_by(Bill.created_at.desc()).first()
-    needs_recompute = False
-    if latest_bill:
-        latest_ts = latest_bill.created_at
-        if not vp_row or (vp_row and vp_row.created_at < latest_ts) or (not n_row) or (n_row and n_row.created_at < latest_ts):
-            needs_recompute = True
+    # rows are keyed by data_version, so a missing row means bills changed since the last computation
+    needs_recompute = charts is None
     try:
         force = request.args.get('force')
         if force and str(force).lower() in ('1', 'true', 'yes'):
             needs_recompute = True
     except Exception:
         pass
+    if needs_recompute:
+        from agents.aggregation_agent import aggregate_user_data
+        from agents.visual_prep_agent import prepare_all
+        with replica_reads(user.id, data_version):
+            charts = prepare_all(aggregate_user_data(user.id))
+        try:
+            save_agent_result(versioned_key('visual_prep_agent_v1', data_version), user.id, json.dumps(charts, default=str), data_version)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
     return jsonify({'charts': charts, 'narration': narration})
 
+@app.route('/api/reminders')
+def api_reminders():
+    user = get_current_user()
+    if not user:
+        return (jsonify({'error': 'authentication required'}), 401)
+    return jsonify(latest_reminders(user.id))
+
+@app.route('/api/forecast')
+def api_forecast():
+    """Projected recurring-bill obligations per month and tag over 3, 6 or 12 months."""
+    user = get_current_user()
+    if not user:
+        return (jsonify({'error': 'authentication required'}), 401)
+    from agents.forecast_agent import ALLOWED_HORIZONS, forecast_user_bills
+    try:
+        months = int(request.args.get('months', 6))
+    except ValueError:
+        months = 0
+    if months not in ALLOWED_HORIZONS:
+        return (jsonify({'error': f'months must be one of {list(ALLOWED_HORIZONS)}'}), 400)
+    return jsonify(forecast_user_bills(user.id, months))
+
 @app.route('/delete-account', methods=['POST'])
 def delete_account():
     user = get_current_user()
     if not user:
         return redirect(url_for('index'))
-    # remove bills, agent results and user
-    Bill.query.filter_by(user_id=user.id).delete()
-    AgentResult.query.filter_by(user_id=user.id).delete()
-    db.session.delete(user)
+    # tombstone now and free the email; owned rows are purged in batches in the background
+    user.deleted_at = datetime.utcnow()
+    user.email = f'deleted+{user.id}'
+    Agent.query.filter_by(user_id=user.id).update({'enabled': False}, synchronize_session=False)
+    db.session.add(AccountPurge(user_id=user.id))
     db.session.commit()
+    start_background_purge(app)
     session.clear()
     flash('Account deleted successfully.', 'info')
     return redirect(url_for('index'))
@@ -418,6 +534,7 @@ if __name__ == '__main__':
             fallback = 'sqlite:///dev_fallback.db'
             print(f'Falling back to local SQLite DB at {fallback}')
             app.config['SQLALCHEMY_DATABASE_URI'] = fallback
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {}
             db.init_app(app)
         with app.app_context():
             try:
@@ -455,9 +572,78 @@ if __name__ == '__main__':
                         print('Added missing column payment_modes.color_class')
                 except Exception as e:
                     print('Could not add payment_modes.color_class:', e)
+            try:
+                user_cols = {c['name'] for c in inspector.get_columns('users')}
+            except Exception:
+                user_cols = set()
+            user_want = {'data_version': 'INTEGER NOT NULL DEFAULT 0', 'deleted_at': 'DATETIME' if is_sqlite else 'TIMESTAMP', 'reporting_currency': "TEXT NOT NULL DEFAULT 'INR'" if is_sqlite else "VARCHAR(10) NOT NULL DEFAULT 'INR'"}
+            for col, coltype in user_want.items():
+                if col not in user_cols:
+                    try:
+                        with db.engine.begin() as conn:
+                            conn.execute(text(f'ALTER TABLE users ADD COLUMN {col} {coltype}'))
+                            print(f'Added missing column users.{col}')
+                    except Exception as e:
+                        print(f'Could not add users.{col}:', e)
+            try:
+                result_cols = {c['name'] for c in inspector.get_columns('agent_results')}
+            except Exception:
+                result_cols = set()
+            if 'data_version' not in result_cols:
+                try:
+                    with db.engine.begin() as conn:
+                        conn.execute(text('ALTER TABLE agent_results ADD COLUMN data_version INTEGER'))
+                        print('Added missing column agent_results.data_version')
+                except Exception as e:
+                    print('Could not add agent_results.data_version:', e)
+            try:
+                agent_cols = {c['name'] for c in inspector.get_columns('agents')}
+            except Exception:
+                agent_cols = set()
+            agent_want = {'claimed_by': 'TEXT' if is_sqlite else 'VARCHAR(64)', 'lease_expires_at': 'DATETIME' if is_sqlite else 'TIMESTAMP'}
+            for col, coltype in agent_want.items():
+                if col not in agent_cols:
+                    try:
+                        with db.engine.begin() as conn:
+                            conn.execute(text(f'ALTER TABLE agents ADD COLUMN {col} {coltype}'))
+                            print(f'Added missing column agents.{col}')
+                    except Exception as e:
+                        print(f'Could not add agents.{col}:', e)
+            for index in Agent.__table__.indexes:
+                try:
+                    index.create(db.engine, checkfirst=True)
+                except Exception as e:
+                    print(f'Could not create index {index.name}:', e)
+            try:
+                # backfill the ledger with the last known payment of bills that predate it (bill id doubles as payment id)
+                with db.engine.begin() as conn:
+                    res = conn.execute(text('INSERT INTO payments (id, bill_id, user_id, paid_at, amount_cents, created_at) '
+                                            'SELECT b.id, b.id, b.user_id, b.last_paid, b.amount_cents, CURRENT_TIMESTAMP FROM bills b '
+                                            'WHERE b.last_paid IS NOT NULL AND b.last_paid <= CURRENT_TIMESTAMP '
+                                            'AND NOT EXISTS (SELECT 1 FROM payments p WHERE p.bill_id = b.id)'))
+                    if res.rowcount:
+                        print(f'Backfilled {res.rowcount} payments from bills.last_paid')
+            except Exception as e:
+                print('Could not backfill payments:', e)
+            rates_file = os.environ.get('EXCHANGE_RATES_FILE') or 'exchange_rates.json'
+            if os.path.exists(rates_file):
+                try:
+                    changed = load_rates_file(rates_file)
+                    if changed:
+                        print(f'Loaded {changed} exchange rates from {rates_file}')
+                except Exception as e:
+                    db.session.rollback()
+                    print('Could not load exchange rates:', e)
             try:
                 seed_defaults(app)
             except Exception as e:
                 print('Warning: seed_defaults failed during startup:', e)
+            try:
+                seeded = seed_default_agents()
+                if seeded:
+                    print(f'Created default agents for {seeded} users')
+            except Exception as e:
+                db.session.rollback()
+                print('Warning: could not create default agents:', e)
     safe_startup()
     app.run(debug=True, host='127.0.0.1', port=5000)
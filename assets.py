@@ -0,0 +1,112 @@
+"""Build-free fingerprinting of files under `static/`.
+
+At startup every static file is hashed by content and registered under a
+fingerprinted name (`css/overview.css` -> `css/overview.1a2b3c4d5e6f.css`).
+Templates link them with `asset_url('css/overview.css')`, and `/assets/...`
+serves them with a one-year `immutable` Cache-Control, so browsers stop
+revalidating them on every page load. A changed file gets a new name on the
+next start.
+
+Text assets are gzipped once at startup (or taken from an existing `.gz`
+file next to the source) and sent as-is to clients that accept gzip.
+"""
+import os
+import gzip
+import hashlib
+import mimetypes
+
+from flask import Flask, Response, abort, request, url_for
+from werkzeug.datastructures import Headers
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map')
+
+
+class Asset:
+    __slots__ = ('source', 'digest', 'mimetype', 'body', 'gzipped')
+
+    def __init__(self, source: str, digest: str, mimetype: str, body: bytes, gzipped: bytes | None):
+        self.source = source
+        self.digest = digest
+        self.mimetype = mimetype
+        self.body = body
+        self.gzipped = gzipped
+
+
+def _fingerprinted_name(filename: str, digest: str) -> str:
+    root, ext = os.path.splitext(filename)
+    return f'{root}.{digest}{ext}'
+
+
+def _guess_mimetype(filename: str) -> str:
+    return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+def _load_asset(path: str, filename: str) -> Asset:
+    with open(path, 'rb') as fh:
+        body = fh.read()
+    digest = hashlib.sha256(body).hexdigest()[:12]
+    gzipped = None
+    if filename.endswith(COMPRESSIBLE):
+        if os.path.isfile(path + '.gz') and os.path.getmtime(path + '.gz') >= os.path.getmtime(path):
+            with open(path + '.gz', 'rb') as fh:
+                gzipped = fh.read()
+        else:
+            gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(gzipped) >= len(body):
+            gzipped = None
+    return Asset(filename, digest, _guess_mimetype(filename), body, gzipped)
+
+
+def build_manifest(static_folder: str) -> dict:
+    """Return {fingerprinted name: Asset} for every file under `static_folder`."""
+    assets = {}
+    for dirpath, _dirnames, filenames in os.walk(static_folder):
+        for name in filenames:
+            if name.endswith('.gz') or name.startswith('.'):
+                continue
+            path = os.path.join(dirpath, name)
+            filename = os.path.relpath(path, static_folder).replace(os.sep, '/')
+            asset = _load_asset(path, filename)
+            assets[_fingerprinted_name(filename, asset.digest)] = asset
+    return assets
+
+
+def init_assets(app: Flask):
+    """Fingerprint static files and register `/assets/<name>` plus the `asset_url` template helper.
+
+    Set ASSETS_FINGERPRINT=0 to fall back to plain `/static` URLs.
+    """
+    if str(os.environ.get('ASSETS_FINGERPRINT', '1')).lower() in ('0', 'false', 'no') or not app.static_folder:
+        app.jinja_env.globals['asset_url'] = lambda filename: url_for('static', filename=filename)
+        return
+    max_age = int(os.environ.get('ASSETS_MAX_AGE') or 31536000)
+    assets = build_manifest(app.static_folder)
+    urls = {asset.source: name for name, asset in assets.items()}
+    app.extensions['billbot_assets'] = assets
+
+    def asset_url(filename: str) -> str:
+        name = urls.get(filename)
+        if name is None:
+            return url_for('static', filename=filename)
+        return url_for('fingerprinted_asset', filename=name)
+
+    app.jinja_env.globals['asset_url'] = asset_url
+
+    @app.route('/assets/<path:filename>')
+    def fingerprinted_asset(filename):
+        asset = assets.get(filename)
+        if asset is None:
+            abort(404)
+        use_gzip = asset.gzipped is not None and 'gzip' in request.accept_encodings
+        etag = f'{asset.digest}.gz' if use_gzip else asset.digest
+        headers = Headers({
+            'Cache-Control': f'public, max-age={max_age}, immutable',
+            'ETag': f'"{etag}"',
+            'Vary': 'Accept-Encoding',
+        })
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers=headers)
+        if use_gzip:
+            headers['Content-Encoding'] = 'gzip'
+            return Response(asset.gzipped, mimetype=asset.mimetype, headers=headers)
+        return Response(asset.body, mimetype=asset.mimetype, headers=headers)
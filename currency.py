@@ -0,0 +1,137 @@
+"""Exchange rates and bulk currency conversion.
+
+Rates live in the `exchange_rates` table and are loaded from a local JSON
+file (no network access), e.g.
+
+    {"base": "USD", "as_of": "2026-10-01", "rates": {"USD": 1, "INR": 83.2, "EUR": 0.92}}
+
+Each process keeps an in-memory copy and reuses it while the table's stamp
+(latest updated_at and row count) is unchanged, so rates loaded from another
+process, e.g. `flask load-rates`, are seen on the next lookup.
+Totals are converted per currency with one factor per currency, either in
+Python (`converter`) or inside SQL aggregates (`conversion_case`).
+"""
+import json
+from datetime import datetime
+from threading import Lock
+
+from sqlalchemy import case, func, update
+
+from db import db
+from models import ExchangeRate, User
+
+DEFAULT_CURRENCY = 'INR'
+SYMBOLS = {'INR': '₹', 'USD': '$', 'EUR': '€', 'GBP': '£', 'JPY': '¥'}
+
+_rates_lock = Lock()
+_rates_cache = {'stamp': None, 'rates': {}}
+
+
+def normalize_currency(code: str | None, default: str = DEFAULT_CURRENCY) -> str:
+    code = (code or '').strip().upper()
+    return code if code.isalpha() and 3 <= len(code) <= 10 else default
+
+
+def supported_currencies() -> list[str]:
+    """Currency codes that have an exchange rate; only the default before any rates are loaded."""
+    return sorted(get_rates()) or [DEFAULT_CURRENCY]
+
+
+def validate_currency(code: str | None, default: str = DEFAULT_CURRENCY) -> str | None:
+    """Return the normalized code, `default` when blank, or None when it has no exchange rate."""
+    if not (code or '').strip():
+        return default
+    code = normalize_currency(code, default='')
+    return code if code in supported_currencies() else None
+
+
+def load_rates_file(path: str) -> int:
+    """Upsert rates from a JSON file. Returns the number of changed rates.
+
+    When anything changed, every user's data_version is bumped so cached
+    charts, forecasts and chat answers are recomputed with the new rates.
+    """
+    with open(path, encoding='utf-8') as fh:
+        doc = json.load(fh)
+    base = normalize_currency(doc.get('base'), default='USD')
+    rates = {normalize_currency(k, default=''): float(v) for k, v in (doc.get('rates') or {}).items() if v}
+    rates.pop('', None)
+    rates.setdefault(base, 1.0)
+    existing = {r.currency: r for r in ExchangeRate.query.all()}
+    changed = 0
+    now = datetime.utcnow()
+    for code, units in rates.items():
+        row = existing.get(code)
+        if row is None:
+            db.session.add(ExchangeRate(currency=code, units_per_base=units, base=base, updated_at=now))
+            changed += 1
+        elif row.units_per_base != units or row.base != base:
+            row.units_per_base = units
+            row.base = base
+            row.updated_at = now
+            changed += 1
+    if changed:
+        db.session.execute(update(User).values(data_version=User.data_version + 1).execution_options(synchronize_session=False))
+    db.session.commit()
+    invalidate_rates_cache()
+    return changed
+
+
+def invalidate_rates_cache():
+    with _rates_lock:
+        _rates_cache['stamp'] = None
+
+
+def get_rates() -> dict:
+    """Return {currency: units_per_base}, served from the in-process cache while the rates stamp is unchanged."""
+    # one aggregate row; load_rates_file commits rates and the data_version bump together,
+    # so a reader that sees the new version also sees the new stamp
+    stamp = tuple(db.session.query(func.max(ExchangeRate.updated_at), func.count(ExchangeRate.currency)).one())
+    with _rates_lock:
+        if _rates_cache['stamp'] == stamp:
+            return _rates_cache['rates']
+    rates = {code: units for code, units in db.session.query(ExchangeRate.currency, ExchangeRate.units_per_base).all() if units}
+    with _rates_lock:
+        _rates_cache['rates'] = rates
+        _rates_cache['stamp'] = stamp
+    return rates
+
+
+def conversion_factors(target: str) -> dict:
+    """Multiplier from each known currency into `target`. Unknown currencies are left unconverted."""
+    rates = get_rates()
+    target_units = rates.get(target)
+    if not target_units:
+        return {}
+    return {code: target_units / units for code, units in rates.items() if code != target}
+
+
+def converter(target: str):
+    """Return `convert(cents, currency) -> cents in target` using one factor lookup per call."""
+    factors = conversion_factors(target)
+
+    def convert(cents, currency):
+        factor = factors.get(currency or DEFAULT_CURRENCY)
+        return int(round((cents or 0) * factor)) if factor else int(cents or 0)
+    return convert
+
+
+def conversion_case(currency_column, target: str):
+    """SQL expression giving the factor that converts `currency_column` amounts into `target`."""
+    factors = conversion_factors(target)
+    if not factors:
+        return 1.0
+    return case(factors, value=currency_column, else_=1.0)
+
+
+def format_amount(cents, currency: str | None) -> str:
+    code = currency or DEFAULT_CURRENCY
+    symbol = SYMBOLS.get(code)
+    amount = (cents or 0) / 100
+    return f'{symbol}{amount:.2f}' if symbol else f'{amount:.2f} {code}'
+
+
+def get_reporting_currency(user_id: str | None) -> str:
+    if not user_id:
+        return DEFAULT_CURRENCY
+    return db.session.query(User.reporting_currency).filter(User.id == user_id).scalar() or DEFAULT_CURRENCY
@@ -1,11 +1,216 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask import Flask
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+from sqlalchemy.sql import Select
 import os
-db = SQLAlchemy()
+import sqlite3
+import time
+from runtime import env_int
+
+REPLICA_BIND = 'replica'
+
+_use_replica = ContextVar('billbot_use_replica', default=False)
+_lag_lock = Lock()
+_lag_state = {'checked_at': 0.0, 'healthy': False}
+_versions_lock = Lock()
+_replica_versions = OrderedDict()
+_sqlite_writer_lock = Lock()
+_WRITE_PREFIXES = ('insert', 'update', 'delete', 'replace', 'create', 'drop', 'alter')
+
+
+class RoutingSession(Session):
+    """Session that sends plain SELECTs to the read replica inside `replica_reads()`.
+
+    Anything issued while flushing, and every write, stays on the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and _use_replica.get() and not self._flushing and isinstance(clause, Select):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+def _engine_options(url: str) -> dict:
+    """Build create_engine() options for `url` from DB_* environment variables."""
+    options = {'pool_pre_ping': str(os.environ.get('DB_POOL_PRE_PING', '1')).lower() in ('1', 'true', 'yes')}
+    if url.startswith('sqlite'):
+        return options
+    for env, key in (('DB_POOL_SIZE', 'pool_size'), ('DB_MAX_OVERFLOW', 'max_overflow'), ('DB_POOL_TIMEOUT', 'pool_timeout')):
+        value = env_int(env)
+        if value is not None:
+            options[key] = value
+    options['pool_recycle'] = env_int('DB_POOL_RECYCLE') or 1800
+    timeout_ms = env_int('DB_STATEMENT_TIMEOUT_MS')
+    if timeout_ms:
+        if url.startswith('postgres'):
+            options['connect_args'] = {'options': f'-c statement_timeout={timeout_ms}'}
+        elif url.startswith('mysql'):
+            options['connect_args'] = {'init_command': f'SET SESSION max_execution_time={timeout_ms}'}
+    return options
+
+
+def _sqlite_tuned() -> bool:
+    return str(os.environ.get('SQLITE_WAL', '1')).lower() in ('1', 'true', 'yes')
+
+
+def _sqlite_on_connect(dbapi_conn, connection_record):
+    if not isinstance(dbapi_conn, sqlite3.Connection) or not _sqlite_tuned():
+        return
+    # autocommit at the driver level; _sqlite_before_execute opens write transactions explicitly
+    dbapi_conn.isolation_level = None
+    cur = dbapi_conn.cursor()
+    try:
+        cur.execute(f"PRAGMA busy_timeout = {env_int('SQLITE_BUSY_TIMEOUT_MS') or 5000}")
+        if cur.execute('PRAGMA journal_mode = WAL').fetchone()[0].lower() == 'wal':
+            cur.execute('PRAGMA synchronous = NORMAL')
+        # negative cache_size is in KiB rather than pages
+        cur.execute(f"PRAGMA cache_size = -{env_int('SQLITE_CACHE_SIZE_KB') or 65536}")
+        cur.execute(f"PRAGMA mmap_size = {env_int('SQLITE_MMAP_SIZE') or 268435456}")
+        cur.execute('PRAGMA temp_store = MEMORY')
+    finally:
+        cur.close()
+    connection_record.info['billbot_sqlite'] = True
+
+
+def _sqlite_managed(conn) -> bool:
+    return conn.dialect.name == 'sqlite' and conn.connection.info.get('billbot_sqlite', False)
+
+
+def _sqlite_before_execute(conn, cursor, statement, parameters, context, executemany):
+    """Open a serialized write transaction before the first write statement.
+
+    Reads run in autocommit so every SELECT sees a fresh WAL snapshot and
+    never blocks. The first write takes a process-wide writer lock and issues
+    BEGIN IMMEDIATE, so writers queue here instead of failing with
+    'database is locked' when a stale read transaction tries to upgrade.
+    """
+    if 'billbot_writer' in conn.info or not _sqlite_managed(conn):
+        return
+    if statement.lstrip()[:7].lower().startswith(_WRITE_PREFIXES) and not cursor.connection.in_transaction:
+        timeout = (env_int('SQLITE_BUSY_TIMEOUT_MS') or 5000) / 1000.0
+        # on timeout fall through to SQLite's own busy handling rather than deadlock
+        conn.info['billbot_writer'] = _sqlite_writer_lock.acquire(timeout=timeout)
+        cursor.execute('BEGIN IMMEDIATE')
+
+
+def _sqlite_release_writer(conn):
+    if conn.info.pop('billbot_writer', False):
+        _sqlite_writer_lock.release()
+
+
+def _sqlite_on_checkin(dbapi_conn, connection_record):
+    # connections returned to the pool mid-transaction are reset without a commit/rollback event
+    if connection_record is not None and connection_record.info.pop('billbot_writer', False):
+        _sqlite_writer_lock.release()
+
+
+def _install_sqlite_listeners():
+    if event.contains(Engine, 'connect', _sqlite_on_connect):
+        return
+    event.listen(Engine, 'connect', _sqlite_on_connect)
+    event.listen(Engine, 'before_cursor_execute', _sqlite_before_execute)
+    event.listen(Engine, 'commit', _sqlite_release_writer)
+    event.listen(Engine, 'rollback', _sqlite_release_writer)
+    event.listen(Pool, 'checkin', _sqlite_on_checkin)
+
 
 def init_db(app: Flask):
     database_url = os.environ.get('DATABASE_URL') or 'sqlite:///dev.db'
     app.config['SQLALCHEMY_DATABASE_URI'] = database_url
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = _engine_options(database_url)
+    _install_sqlite_listeners()
+    replica_url = os.environ.get('DATABASE_REPLICA_URL')
+    if replica_url:
+        app.config['SQLALCHEMY_BINDS'] = {REPLICA_BIND: {'url': replica_url, **_engine_options(replica_url)}}
     db.init_app(app)
     return db
+
+
+def _replica_lag_seconds(engine) -> float:
+    with engine.connect() as conn:
+        if engine.dialect.name == 'postgresql':
+            return float(conn.execute(text('SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)')).scalar() or 0)
+        if engine.dialect.name == 'mysql':
+            try:
+                row = conn.exec_driver_sql('SHOW REPLICA STATUS').mappings().first()
+            except Exception:
+                # servers older than 8.0.22
+                row = conn.exec_driver_sql('SHOW SLAVE STATUS').mappings().first()
+            if row is None:
+                return 0.0
+            lag = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+            # NULL means replication is stopped or broken
+            return float('inf') if lag is None else float(lag)
+    return 0.0
+
+
+def _replica_healthy(engine) -> bool:
+    """Return whether replica lag is within DB_REPLICA_MAX_LAG_SECONDS, re-checking at most every DB_REPLICA_CHECK_SECONDS."""
+    now = time.monotonic()
+    with _lag_lock:
+        if now - _lag_state['checked_at'] < (env_int('DB_REPLICA_CHECK_SECONDS') or 5):
+            return _lag_state['healthy']
+        _lag_state['checked_at'] = now
+    try:
+        healthy = _replica_lag_seconds(engine) <= (env_int('DB_REPLICA_MAX_LAG_SECONDS') or 5)
+    except Exception:
+        healthy = False
+    _lag_state['healthy'] = healthy
+    return healthy
+
+
+def _replica_has_version(engine, user_id: str, data_version: int) -> bool:
+    """Return whether the replica has applied `data_version` for `user_id`.
+
+    Versions only grow, so the highest version seen on the replica is cached
+    per user and the replica is queried only after a newer write.
+    """
+    with _versions_lock:
+        seen = _replica_versions.get(user_id)
+    if seen is not None and seen >= data_version:
+        return True
+    try:
+        with engine.connect() as conn:
+            replica_version = conn.execute(text('SELECT data_version FROM users WHERE id = :id'), {'id': user_id}).scalar()
+    except Exception:
+        return False
+    if replica_version is None:
+        return False
+    with _versions_lock:
+        _replica_versions[user_id] = max(replica_version, _replica_versions.get(user_id, replica_version))
+        _replica_versions.move_to_end(user_id)
+        while len(_replica_versions) > (env_int('DB_REPLICA_VERSION_CACHE_SIZE') or 10000):
+            _replica_versions.popitem(last=False)
+    return replica_version >= data_version
+
+
+@contextmanager
+def replica_reads(user_id: str | None = None, data_version: int | None = None):
+    """Route SELECTs issued by `db.session` in this block to the read replica.
+
+    Falls back to the primary when no replica is configured, when it lags
+    too far behind, or when it has not yet seen `data_version` for `user_id`
+    (so a user never reads data older than their own last write).
+    """
+    use = False
+    engine = db.engines.get(REPLICA_BIND)
+    if engine is not None and _replica_healthy(engine):
+        use = user_id is None or data_version is None or _replica_has_version(engine, user_id, data_version)
+    token = _use_replica.set(use)
+    try:
+        yield use
+    finally:
+        _use_replica.reset(token)
@@ -0,0 +1,75 @@
+"""Local stand-in for the Gemini `generateContent` endpoint.
+
+Point the chat agent at it with GEMINI_BASE_URL=http://127.0.0.1:8089 (any
+GEMINI_API_KEY value works). Latency and failure rate are configurable so
+load tests can show how slow or flaky provider calls affect the rest of the
+app.
+
+    python loadtest/fake_genai.py --port 8089 --latency-ms 800 --jitter-ms 400 --error-rate 0.02
+"""
+import argparse
+import json
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_GENERATE_RE = re.compile(r'^/[^/]+/models/([^/:]+):generateContent')
+
+
+def make_handler(latency_ms: float, jitter_ms: float, error_rate: float):
+    class FakeGenAIHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: dict):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            raw = self.rfile.read(length) if length else b''
+            m = _GENERATE_RE.match(self.path)
+            if not m:
+                self._send(404, {'error': {'code': 404, 'message': f'unknown path {self.path}', 'status': 'NOT_FOUND'}})
+                return
+            delay = max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000.0
+            time.sleep(delay)
+            if random.random() < error_rate:
+                self._send(503, {'error': {'code': 503, 'message': 'fake provider overloaded', 'status': 'UNAVAILABLE'}})
+                return
+            prompt_tokens = max(1, len(raw) // 4)
+            text = f'**Fake answer** from `{m.group(1)}` after {delay * 1000:.0f} ms.'
+            self._send(200, {
+                'candidates': [{'content': {'role': 'model', 'parts': [{'text': text}]}, 'finishReason': 'STOP', 'index': 0}],
+                'usageMetadata': {'promptTokenCount': prompt_tokens, 'candidatesTokenCount': len(text) // 4, 'totalTokenCount': prompt_tokens + len(text) // 4},
+                'modelVersion': m.group(1),
+            })
+
+    return FakeGenAIHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency-ms', type=float, default=800.0)
+    parser.add_argument('--jitter-ms', type=float, default=200.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(args.latency_ms, args.jitter_ms, args.error_rate))
+    print(f'fake genai listening on http://{args.host}:{args.port} (latency {args.latency_ms}±{args.jitter_ms} ms, error rate {args.error_rate})')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+"""Concurrent load test of scripted BillBot user journeys.
+
+Each virtual user signs up once, then repeats login -> overview page ->
+overview data polls -> bills page -> chat until the level's time runs out.
+Concurrency is stepped through `--levels`, and throughput, latency
+percentiles and error rates are reported per route for every level.
+
+Start the app with the chat agent pointed at the fake provider, e.g.
+
+    python loadtest/fake_genai.py --latency-ms 800 &
+    GEMINI_BASE_URL=http://127.0.0.1:8089 GEMINI_API_KEY=fake python app.py
+    python loadtest/run.py --base-url http://127.0.0.1:5000 --levels 1,10,50,100 --duration 30
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+from http.cookiejar import CookieJar
+from urllib import error, parse, request
+
+CHAT_QUESTIONS = [
+    'How much do I spend per month?',
+    'Which bill is the most expensive?',
+    'What is due next?',
+    'Where can I cut costs?',
+]
+
+
+class _NoRedirect(request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, route: str, seconds: float, ok: bool):
+        with self._lock:
+            self.latencies[route].append(seconds)
+            if not ok:
+                self.errors[route] += 1
+
+
+def _percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # nearest-rank: the smallest value with at least pct% of samples at or below it
+    idx = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+class VirtualUser:
+    def __init__(self, base_url: str, stats: Stats, timeout: float, unique_chat: bool):
+        self.base_url = base_url.rstrip('/')
+        self.stats = stats
+        self.timeout = timeout
+        self.unique_chat = unique_chat
+        self.email = f'loadtest+{uuid.uuid4().hex[:12]}@example.com'
+        self.password = uuid.uuid4().hex
+        self.opener = request.build_opener(request.HTTPCookieProcessor(CookieJar()), _NoRedirect())
+
+    def call(self, route: str, method: str, path: str, form=None, payload=None, expect_status: int = 200, expect_location: str | None = None):
+        """Issue one request and record it; only `expect_status` (and `expect_location` for redirects) counts as success."""
+        data, headers = None, {}
+        if form is not None:
+            data = parse.urlencode(form).encode('utf-8')
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif payload is not None:
+            data = json.dumps(payload).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        req = request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        started = time.perf_counter()
+        status, location = None, None
+        try:
+            with self.opener.open(req, timeout=self.timeout) as resp:
+                resp.read()
+                status = resp.status
+        except error.HTTPError as e:
+            # redirects surface as HTTPError because redirects are not followed
+            status, location = e.code, e.headers.get('Location')
+        except Exception:
+            pass
+        ok = status == expect_status and (expect_location is None or parse.urlparse(location or '').path == expect_location)
+        self.stats.record(route, time.perf_counter() - started, ok)
+        return ok
+
+    def setup(self):
+        self.call('signup', 'POST', '/signup', form={'signupEmail': self.email, 'signupPassword': self.password}, expect_status=302, expect_location='/overview')
+        self.call('create_bill', 'POST', '/bills/create', form={'name': 'Rent', 'amount': str(random.randint(500, 50000)), 'period': 'monthly', 'tag': 'rent', 'first_payment_date': '2025-01-05'}, expect_status=302, expect_location='/bills')
+
+    def journey(self, polls: int):
+        # a failed login redirects to '/', and every page after it would only time that redirect
+        if not self.call('login', 'POST', '/login', form={'loginEmail': self.email, 'loginPassword': self.password}, expect_status=302, expect_location='/overview'):
+            return
+        self.call('overview', 'GET', '/overview')
+        for _ in range(polls):
+            self.call('api_overview_data', 'GET', '/api/overview/data')
+        self.call('bills', 'GET', '/bills')
+        question = random.choice(CHAT_QUESTIONS)
+        if self.unique_chat:
+            question += f' ({uuid.uuid4().hex[:6]})'
+        self.call('api_chat', 'POST', '/api/chat', payload={'message': question})
+
+
+def run_level(args, concurrency: int) -> dict:
+    stats = Stats()
+    users = [VirtualUser(args.base_url, stats, args.timeout, args.unique_chat) for _ in range(concurrency)]
+    setup_threads = [threading.Thread(target=u.setup) for u in users]
+    for t in setup_threads:
+        t.start()
+    for t in setup_threads:
+        t.join()
+    stats = Stats()
+    for u in users:
+        u.stats = stats
+    deadline = time.monotonic() + args.duration
+
+    def loop(user: VirtualUser):
+        while time.monotonic() < deadline:
+            user.journey(args.polls)
+            if args.think_ms:
+                time.sleep(args.think_ms / 1000.0)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=loop, args=(u,)) for u in users]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+    routes = {}
+    for route, values in sorted(stats.latencies.items()):
+        values.sort()
+        routes[route] = {
+            'requests': len(values),
+            'rps': len(values) / elapsed if elapsed else 0.0,
+            'p50_ms': _percentile(values, 50) * 1000,
+            'p99_ms': _percentile(values, 99) * 1000,
+            'error_rate': stats.errors[route] / len(values) if values else 0.0,
+        }
+    return {'concurrency': concurrency, 'elapsed_s': elapsed, 'routes': routes}
+
+
+def print_level(result: dict):
+    print(f"\n== concurrency {result['concurrency']} ({result['elapsed_s']:.1f}s) ==")
+    print(f"{'route':<20}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>9}")
+    for route, r in result['routes'].items():
+        print(f"{route:<20}{r['requests']:>10}{r['rps']:>10.1f}{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['error_rate']:>8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Step concurrency and report per-route throughput, p99 latency and error rate.')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--levels', default='1,10,50,100', help='comma-separated concurrent user counts')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds per concurrency level')
+    parser.add_argument('--polls', type=int, default=3, help='overview data polls per journey')
+    parser.add_argument('--think-ms', type=float, default=0.0, help='pause between journeys')
+    parser.add_argument('--timeout', type=float, default=60.0, help='per-request timeout in seconds')
+    parser.add_argument('--unique-chat', action='store_true', help='make every chat message unique to bypass the response cache')
+    parser.add_argument('--json', dest='json_out', help='also write results to this file')
+    args = parser.parse_args()
+    results = []
+    for level in [int(x) for x in args.levels.split(',') if x.strip()]:
+        result = run_level(args, level)
+        print_level(result)
+        results.append(result)
+    if args.json_out:
+        with open(args.json_out, 'w') as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""In-process request, SQL and LLM instrumentation for BillBot.
+
+Counters and histograms are kept in memory per worker process and rendered in
+the Prometheus text exposition format on `/metrics`. No external client
+library is required.
+"""
+import os
+import time
+import logging
+from threading import Lock
+
+from flask import Flask, Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('billbot.metrics')
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name: str, doc: str, labels=()):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.doc}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, v in items:
+            lines.append(f'{self.name}{_format_labels(self.labels, label_values)} {v}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, doc: str, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.doc}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+        for label_values, (bucket_counts, total, n) in items:
+            for bound, c in zip(self.buckets, bucket_counts):
+                le = 'le="%s"' % bound
+                lines.append(f'{self.name}_bucket{_format_labels(self.labels, label_values, le)} {c}')
+            le = 'le="+Inf"'
+            lines.append(f'{self.name}_bucket{_format_labels(self.labels, label_values, le)} {n}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labels, label_values)} {total}')
+            lines.append(f'{self.name}_count{_format_labels(self.labels, label_values)} {n}')
+        return lines
+
+
+REGISTRY = []
+
+
+def _register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+http_requests_total = _register(Counter('billbot_http_requests_total', 'HTTP requests served.', ('route', 'method', 'status')))
+http_request_seconds = _register(Histogram('billbot_http_request_duration_seconds', 'HTTP request latency.', ('route', 'method')))
+http_request_sql_statements = _register(Histogram('billbot_http_request_sql_statements', 'SQL statements issued per HTTP request.', ('route',), buckets=COUNT_BUCKETS))
+sql_statements_total = _register(Counter('billbot_sql_statements_total', 'SQL statements executed.', ('route', 'outcome')))
+sql_statement_seconds = _register(Histogram('billbot_sql_statement_duration_seconds', 'SQL statement latency.', ('route',)))
+sql_slow_statements_total = _register(Counter('billbot_sql_slow_statements_total', 'SQL statements slower than METRICS_SLOW_QUERY_MS.', ('route',)))
+llm_requests_total = _register(Counter('billbot_llm_requests_total', 'Calls to the LLM provider.', ('model', 'outcome')))
+llm_request_seconds = _register(Histogram('billbot_llm_request_duration_seconds', 'LLM provider call latency.', ('model',), buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)))
+llm_tokens_total = _register(Counter('billbot_llm_tokens_total', 'Tokens reported by the LLM provider.', ('model', 'kind')))
+chat_cache_total = _register(Counter('billbot_chat_cache_total', 'Chat response cache lookups.', ('result',)))
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def _current_route() -> str:
+    if has_request_context():
+        return request.endpoint or 'unmatched'
+    return 'background'
+
+
+def _slow_query_threshold() -> float:
+    try:
+        return float(os.environ.get('METRICS_SLOW_QUERY_MS') or 0) / 1000.0
+    except ValueError:
+        return 0.0
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('billbot_query_start', []).append(time.perf_counter())
+
+
+def _record_statement(conn, statement, outcome: str):
+    stack = conn.info.get('billbot_query_start')
+    if not stack:
+        return
+    elapsed = time.perf_counter() - stack.pop()
+    route = _current_route()
+    sql_statements_total.inc(route, outcome)
+    sql_statement_seconds.observe(elapsed, route)
+    if has_request_context():
+        g._billbot_sql_count = getattr(g, '_billbot_sql_count', 0) + 1
+    threshold = _slow_query_threshold()
+    if threshold and elapsed >= threshold:
+        sql_slow_statements_total.inc(route)
+        logger.warning('slow query route=%s duration_ms=%.1f sql=%s', route, elapsed * 1000, ' '.join((statement or '').split())[:500])
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_statement(conn, statement, 'ok')
+
+
+def _handle_error(ctx):
+    # a failing statement never reaches after_cursor_execute; pop its start time here
+    if ctx.connection is not None and ctx.execution_context is not None:
+        _record_statement(ctx.connection, ctx.statement, 'error')
+
+
+def observe_llm_call(model: str, seconds: float, response=None, error: bool = False):
+    """Record latency, outcome and token usage of one provider call."""
+    llm_requests_total.inc(model, 'error' if error else 'ok')
+    llm_request_seconds.observe(seconds, model)
+    usage = getattr(response, 'usage_metadata', None) if response is not None else None
+    if usage is None:
+        return
+    for kind, attr in (('prompt', 'prompt_token_count'), ('completion', 'candidates_token_count')):
+        n = getattr(usage, attr, None)
+        if n:
+            llm_tokens_total.inc(model, kind, amount=n)
+
+
+def init_metrics(app: Flask):
+    """Install request/SQL hooks and the `/metrics` endpoint.
+
+    Disabled when METRICS_ENABLED is set to 0/false.
+    """
+    if str(os.environ.get('METRICS_ENABLED', '1')).lower() in ('0', 'false', 'no'):
+        return
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+
+    @app.before_request
+    def _metrics_start_timer():
+        g._billbot_request_start = time.perf_counter()
+        g._billbot_sql_count = 0
+
+    @app.after_request
+    def _metrics_record_request(response):
+        start = getattr(g, '_billbot_request_start', None)
+        if start is None:
+            return response
+        route = request.endpoint or 'unmatched'
+        http_requests_total.inc(route, request.method, str(response.status_code))
+        http_request_seconds.observe(time.perf_counter() - start, route, request.method)
+        http_request_sql_statements.observe(getattr(g, '_billbot_sql_count', 0), route)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
@@ -2,16 +2,35 @@ import uuid
 from datetime import datetime
 from db import db
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Text, Boolean, Index, Float, delete, update
+
+PERIOD_MONTHS = {'monthly': 1, '2-months': 2, '3-months': 3, '6-months': 6, 'yearly': 12}
+_UNIT_DAYS = {'days': 1, 'weeks': 7}
 
 def generate_uuid():
     return str(uuid.uuid4())
 
+def period_step(period, interval_count=1, interval_unit=None):
+    """Return ('months'|'days', n) for one billing period, or None for one-time bills."""
+    if period == 'one-time' or not period:
+        return None
+    count = max(int(interval_count or 1), 1)
+    if period in PERIOD_MONTHS:
+        months = PERIOD_MONTHS[period]
+        return ('months', months * count if period in ('monthly', 'yearly') else months)
+    unit = interval_unit or 'months'
+    if unit in _UNIT_DAYS:
+        return ('days', _UNIT_DAYS[unit] * count)
+    return ('months', 12 * count if unit == 'years' else count)
+
 class User(db.Model):
     __tablename__ = 'users'
     id = Column(String(36), primary_key=True, default=generate_uuid)
     email = Column(String(255), unique=True, nullable=False)
     password_hash = Column(String(255), nullable=False)
+    data_version = Column(Integer, nullable=False, default=0)
+    deleted_at = Column(DateTime, nullable=True)
+    reporting_currency = Column(String(10), nullable=False, default='INR')
     created_at = Column(DateTime, default=datetime.utcnow)
 
     def to_dict(self):
@@ -40,7 +59,30 @@ class Bill(db.Model):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     def to_dict(self):
-        return {'id': self.id, 'user_id': self.user_id, 'name': self.name, 'description': self.description, 'tag': self.tag, 'payment_mode': self.payment_mode, 'amount_cents': self.amount_cents, 'period': self.period, 'last_paid': self.last_paid.isoformat() if self.last_paid else None, 'next_due': self.next_due.isoformat() if self.next_due else None, 'due_date': self.due_date.isoformat() if self.due_date else None, 'created_at': self.created_at.isoformat()}
+        return {'id': self.id, 'user_id': self.user_id, 'name': self.name, 'description': self.description, 'tag': self.tag, 'payment_mode': self.payment_mode, 'amount_cents': self.amount_cents, 'currency': self.currency, 'period': self.period, 'last_paid': self.last_paid.isoformat() if self.last_paid else None, 'next_due': self.next_due.isoformat() if self.next_due else None, 'due_date': self.due_date.isoformat() if self.due_date else None, 'created_at': self.created_at.isoformat()}
+
+class Payment(db.Model):
+    """Append-only ledger of bill payments; spend charts are computed from here."""
+    __tablename__ = 'payments'
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    bill_id = Column(String(36), ForeignKey('bills.id'), nullable=False, index=True)
+    user_id = Column(String(36), ForeignKey('users.id'), nullable=False)
+    paid_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    amount_cents = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (Index('ix_payments_user_id_paid_at', 'user_id', 'paid_at'),)
+
+    def to_dict(self):
+        return {'id': self.id, 'bill_id': self.bill_id, 'user_id': self.user_id, 'paid_at': self.paid_at.isoformat(), 'amount_cents': self.amount_cents, 'created_at': self.created_at.isoformat()}
+
+class ExchangeRate(db.Model):
+    """Units of `currency` per one unit of the rates file's base currency."""
+    __tablename__ = 'exchange_rates'
+    currency = Column(String(10), primary_key=True)
+    units_per_base = Column(Float, nullable=False)
+    base = Column(String(10), nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
 
 class Tag(db.Model):
     __tablename__ = 'tags'
@@ -69,18 +111,46 @@ class Agent(db.Model):
     schedule = Column(String(255), nullable=True)
     last_run_at = Column(DateTime, nullable=True)
     next_run_at = Column(DateTime, nullable=True)
+    claimed_by = Column(String(64), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=True)
 
+    __table_args__ = (Index('ix_agents_enabled_next_run_at', 'enabled', 'next_run_at'),)
+
 class AgentRun(db.Model):
     __tablename__ = 'agent_runs'
     id = Column(String(36), primary_key=True, default=generate_uuid)
-    agent_id = Column(String(36), ForeignKey('agents.id'), nullable=False)
+    agent_id = Column(String(36), ForeignKey('agents.id'), nullable=False, index=True)
     run_at = Column(DateTime, default=datetime.utcnow)
     status = Column(String(32), nullable=True)
     detail = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+def bump_data_version(user_id: str):
+    """Atomically increment the user's data_version in the current transaction.
+
+    Call this alongside every bill mutation, before committing, so cached
+    results keyed on the previous version stop matching.
+    """
+    db.session.execute(update(User).where(User.id == user_id).values(data_version=User.data_version + 1).execution_options(synchronize_session=False))
+
+def get_data_version(user_id: str | None) -> int:
+    if not user_id:
+        return 0
+    return db.session.query(User.data_version).filter(User.id == user_id).scalar() or 0
+
+def versioned_key(agent_key: str, data_version: int) -> str:
+    return f'{agent_key}:v{data_version}'
+
+def save_agent_result(agent_key: str, user_id: str | None, payload: str, data_version: int | None = None):
+    """Replace the cached result for (agent_key, user_id) without committing.
+
+    Rows of older data versions are left to `scheduler.prune_agent_results`.
+    """
+    db.session.execute(delete(AgentResult).where(AgentResult.agent_key == agent_key, AgentResult.user_id == user_id).execution_options(synchronize_session=False))
+    db.session.add(AgentResult(agent_key=agent_key, user_id=user_id, payload=payload, data_version=data_version))
+
 def seed_defaults(app=None):
     created = 0
     if app:
@@ -113,7 +183,27 @@ class AgentResult(db.Model):
     agent_key = Column(String(128), nullable=False, index=True)
     user_id = Column(String(36), nullable=True, index=True)
     payload = Column(Text, nullable=False)
+    data_version = Column(Integer, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     def to_dict(self):
         return {'id': self.id, 'agent_key': self.agent_key, 'user_id': self.user_id, 'payload': self.payload, 'created_at': self.created_at.isoformat()}
+
+class AccountPurge(db.Model):
+    __tablename__ = 'account_purges'
+    id = Column(String(36), primary_key=True, default=generate_uuid)
+    user_id = Column(String(36), nullable=False, index=True)
+    status = Column(String(16), nullable=False, default='pending')
+    progress = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    claimed_by = Column(String(64), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (Index('ix_account_purges_status_next_attempt_at', 'status', 'next_attempt_at'),)
+
+    def to_dict(self):
+        return {'id': self.id, 'user_id': self.user_id, 'status': self.status, 'progress': self.progress, 'attempts': self.attempts, 'last_error': self.last_error, 'created_at': self.created_at.isoformat()}
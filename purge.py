@@ -0,0 +1,140 @@
+"""Background, chunked purge of deleted accounts.
+
+`delete_account` only tombstones the user and queues an `AccountPurge` row.
+The rows owned by that user are then deleted here in bounded batches, each
+in its own short transaction, so one large account never holds locks long
+enough to stall other users. Progress is recorded on the purge row and
+failed purges are retried with backoff.
+"""
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta
+from threading import Event, Lock, Thread
+
+from flask import Flask
+from sqlalchemy import delete, or_, select, update
+
+from db import db
+from models import AccountPurge, Agent, AgentResult, AgentRun, Bill, Payment, User
+from runtime import NODE_ID, env_int
+
+MAX_ATTEMPTS = 5
+
+logger = logging.getLogger('billbot.purge')
+_purge_wakeup = Event()
+_purge_thread = None
+_purge_thread_lock = Lock()
+
+
+# (progress key, model, id query) in foreign-key-safe order; the user row goes last
+PURGE_STEPS = [
+    ('agent_runs', AgentRun, lambda uid: select(AgentRun.id).join(Agent, AgentRun.agent_id == Agent.id).where(Agent.user_id == uid)),
+    ('agents', Agent, lambda uid: select(Agent.id).where(Agent.user_id == uid)),
+    ('agent_results', AgentResult, lambda uid: select(AgentResult.id).where(AgentResult.user_id == uid)),
+    ('payments', Payment, lambda uid: select(Payment.id).where(Payment.user_id == uid)),
+    ('bills', Bill, lambda uid: select(Bill.id).where(Bill.user_id == uid)),
+    ('users', User, lambda uid: select(User.id).where(User.id == uid)),
+]
+
+
+def claim_purges(now: datetime, limit: int, lease_seconds: int) -> list[str]:
+    token = f"{NODE_ID}:{uuid.uuid4().hex[:8]}"
+    lease_free = or_(AccountPurge.lease_expires_at.is_(None), AccountPurge.lease_expires_at < now)
+    ids = [row[0] for row in db.session.query(AccountPurge.id).filter(AccountPurge.status.in_(('pending', 'running')), AccountPurge.next_attempt_at <= now, lease_free).order_by(AccountPurge.next_attempt_at.asc()).limit(limit).all()]
+    if not ids:
+        db.session.rollback()
+        return []
+    db.session.execute(update(AccountPurge).where(AccountPurge.id.in_(ids), lease_free).values(claimed_by=token, lease_expires_at=now + timedelta(seconds=lease_seconds), status='running').execution_options(synchronize_session=False))
+    db.session.commit()
+    return [row[0] for row in db.session.query(AccountPurge.id).filter(AccountPurge.claimed_by == token).all()]
+
+
+def run_purge(purge_id: str) -> bool:
+    """Delete everything owned by the purge's user in batches. Returns True when finished."""
+    batch_size = env_int('PURGE_BATCH_SIZE', 500)
+    pause = env_int('PURGE_BATCH_PAUSE_MS', 10) / 1000.0
+    lease_seconds = env_int('PURGE_LEASE_SECONDS', 300)
+    purge = db.session.get(AccountPurge, purge_id)
+    if purge is None:
+        return False
+    user_id = purge.user_id
+    try:
+        progress = json.loads(purge.progress or '{}')
+    except Exception:
+        progress = {}
+    try:
+        for key, model, id_query in PURGE_STEPS:
+            while True:
+                ids = [row[0] for row in db.session.execute(id_query(user_id).limit(batch_size)).all()]
+                if not ids:
+                    break
+                db.session.execute(delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False))
+                progress[key] = progress.get(key, 0) + len(ids)
+                progress['step'] = key
+                now = datetime.utcnow()
+                db.session.execute(update(AccountPurge).where(AccountPurge.id == purge_id).values(progress=json.dumps(progress), lease_expires_at=now + timedelta(seconds=lease_seconds), updated_at=now).execution_options(synchronize_session=False))
+                db.session.commit()
+                if len(ids) < batch_size:
+                    break
+                if pause:
+                    time.sleep(pause)
+        progress['step'] = 'done'
+        db.session.execute(update(AccountPurge).where(AccountPurge.id == purge_id).values(status='done', progress=json.dumps(progress), claimed_by=None, lease_expires_at=None, last_error=None, updated_at=datetime.utcnow()).execution_options(synchronize_session=False))
+        db.session.commit()
+        return True
+    except Exception as e:
+        db.session.rollback()
+        attempts = (purge.attempts or 0) + 1
+        status = 'failed' if attempts >= MAX_ATTEMPTS else 'pending'
+        now = datetime.utcnow()
+        db.session.execute(update(AccountPurge).where(AccountPurge.id == purge_id).values(status=status, attempts=attempts, last_error=str(e)[:1000], progress=json.dumps(progress), next_attempt_at=now + timedelta(seconds=min(30 * 2 ** attempts, 3600)), claimed_by=None, lease_expires_at=None, updated_at=now).execution_options(synchronize_session=False))
+        db.session.commit()
+        return False
+
+
+def sweep_purges(app: Flask) -> int:
+    """Run every due purge, including retries. Returns the number completed."""
+    lease_seconds = env_int('PURGE_LEASE_SECONDS', 300)
+    done = 0
+    with app.app_context():
+        while True:
+            purge_ids = claim_purges(datetime.utcnow(), 10, lease_seconds)
+            if not purge_ids:
+                break
+            for purge_id in purge_ids:
+                if run_purge(purge_id):
+                    done += 1
+    return done
+
+
+def _purge_worker(app: Flask):
+    poll_seconds = env_int('PURGE_POLL_SECONDS', 60)
+    while True:
+        _purge_wakeup.wait(timeout=poll_seconds)
+        _purge_wakeup.clear()
+        try:
+            sweep_purges(app)
+        except Exception:
+            logger.exception('purge sweep failed')
+
+
+def start_purge_worker(app: Flask):
+    """Start this process's purge worker once.
+
+    It sweeps every PURGE_POLL_SECONDS, independently of the scheduler, so
+    failed purges and purges left behind by a dead node are retried
+    once their backoff or lease runs out.
+    """
+    global _purge_thread
+    with _purge_thread_lock:
+        if _purge_thread is None or not _purge_thread.is_alive():
+            _purge_thread = Thread(target=_purge_worker, args=(app,), daemon=True, name='billbot-purge')
+            _purge_thread.start()
+
+
+def start_background_purge(app: Flask):
+    """Wake the purge worker to pick up a newly queued purge right away."""
+    start_purge_worker(app)
+    _purge_wakeup.set()
@@ -0,0 +1,17 @@
+"""Process-level helpers shared by the database setup and background workers."""
+import os
+import socket
+
+# identifies this process in leases taken by the scheduler and purge workers
+NODE_ID = f"{socket.gethostname()}:{os.getpid()}"[:48]
+
+
+def env_int(name: str, default: int | None = None) -> int | None:
+    """Read an integer environment variable, returning `default` when unset, empty or invalid."""
+    value = os.environ.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
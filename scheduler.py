@@ -0,0 +1,269 @@
+"""Sweep-based runner for scheduled `Agent` rows (due-date reminders, rollups).
+
+One sweep selects due agents with an indexed `next_run_at <= now` query,
+claims them with a lease so concurrent app instances never run the same
+agent twice, executes the jobs on a bounded thread pool and writes the
+resulting `AgentRun`/`AgentResult` rows and agent reschedules in bulk.
+"""
+import os
+import re
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from threading import Lock
+
+from flask import Flask
+from sqlalchemy import and_, bindparam, delete, or_, select, update
+
+from db import db, replica_reads
+from models import Agent, AgentRun, AgentResult, Bill, User, get_data_version, versioned_key
+from runtime import NODE_ID, env_int
+
+_executor = None
+_executor_lock = Lock()
+
+# (type, schedule, config) of the agents every user gets
+DEFAULT_AGENTS = (
+    ('reminder', 'daily', {'days_ahead': 3}),
+    ('rollup', 'daily', {'months': 12}),
+)
+REMINDER_KEY = 'reminder_agent_v1'
+
+_EVERY_RE = re.compile(r'^every\s+(\d+)\s*(minute|hour|day|week)s?$')
+_NAMED_SCHEDULES = {'hourly': timedelta(hours=1), 'daily': timedelta(days=1), 'weekly': timedelta(weeks=1)}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=env_int('SCHEDULER_WORKERS', 4), thread_name_prefix='billbot-agent')
+        return _executor
+
+
+def compute_next_run(schedule: str | None, after: datetime) -> datetime | None:
+    """Return the next run time for `schedule` strictly after `after`.
+
+    Accepts 'hourly', 'daily', 'weekly', 'every <n> minutes|hours|days|weeks'
+    or a five-field crontab expression. Empty schedules are one-shot and
+    return None.
+    """
+    if not schedule:
+        return None
+    s = schedule.strip().lower()
+    if s in _NAMED_SCHEDULES:
+        return after + _NAMED_SCHEDULES[s]
+    m = _EVERY_RE.match(s)
+    if m:
+        n = max(int(m.group(1)), 1)
+        return after + timedelta(**{m.group(2) + 's': n})
+    try:
+        from apscheduler.triggers.cron import CronTrigger
+        trigger = CronTrigger.from_crontab(schedule, timezone='UTC')
+        nxt = trigger.get_next_fire_time(None, after.replace(tzinfo=trigger.timezone) + timedelta(seconds=1))
+        return nxt.replace(tzinfo=None) if nxt else None
+    except Exception:
+        return None
+
+
+def _load_config(spec: dict) -> dict:
+    try:
+        return json.loads(spec.get('config') or '{}') or {}
+    except Exception:
+        return {}
+
+
+def _run_reminder(spec: dict, now: datetime) -> dict:
+    cfg = _load_config(spec)
+    days_ahead = int(cfg.get('days_ahead', 3))
+    q = Bill.query.filter(Bill.user_id == spec['user_id'], Bill.active.isnot(False), Bill.next_due.isnot(None), Bill.next_due >= now, Bill.next_due <= now + timedelta(days=days_ahead))
+    if spec.get('bill_id'):
+        q = q.filter(Bill.id == spec['bill_id'])
+    due = [{'id': b.id, 'name': b.name, 'amount_cents': b.amount_cents, 'currency': b.currency, 'next_due': b.next_due.isoformat()} for b in q.order_by(Bill.next_due.asc()).all()]
+    payload = {'generated_at': now.isoformat(), 'days_ahead': days_ahead, 'due': due}
+    return {'status': 'ok', 'detail': json.dumps({'due_count': len(due)}), 'results': [(f"{REMINDER_KEY}:{spec['id']}", payload, None)]}
+
+
+def _run_rollup(spec: dict, now: datetime) -> dict:
+    from agents.aggregation_agent import aggregate_user_data
+    from agents.visual_prep_agent import prepare_all
+    cfg = _load_config(spec)
+    # read the version first so a concurrent bill write leaves this result stale rather than mislabelled
+    data_version = get_data_version(spec['user_id'])
+    with replica_reads(spec['user_id'], data_version):
+        agg = aggregate_user_data(spec['user_id'], months=int(cfg.get('months', 12)))
+    charts = prepare_all(agg)
+    return {'status': 'ok', 'detail': json.dumps({'num_bills': len(agg.get('bills', []))}), 'results': [(versioned_key('visual_prep_agent_v1', data_version), charts, data_version)]}
+
+
+JOBS = {
+    'reminder': _run_reminder,
+    'rollup': _run_rollup,
+}
+
+
+def _execute(app: Flask, spec: dict, now: datetime) -> dict:
+    job = JOBS.get(spec['type'])
+    if job is None:
+        return {'status': 'skipped', 'detail': f"unknown agent type {spec['type']!r}", 'results': []}
+    try:
+        with app.app_context():
+            return job(spec, now)
+    except Exception as e:
+        return {'status': 'error', 'detail': str(e)[:1000], 'results': []}
+
+
+def ensure_default_agents(user_id: str, now: datetime | None = None) -> int:
+    """Add any of DEFAULT_AGENTS the user is missing, due immediately. Does not commit."""
+    existing = {row[0] for row in db.session.query(Agent.type).filter(Agent.user_id == user_id, Agent.bill_id.is_(None)).all()}
+    added = 0
+    for agent_type, schedule, config in DEFAULT_AGENTS:
+        if agent_type not in existing:
+            db.session.add(Agent(user_id=user_id, type=agent_type, schedule=schedule, config=json.dumps(config), enabled=True, next_run_at=now or datetime.utcnow()))
+            added += 1
+    return added
+
+
+def seed_default_agents(batch_size: int = 500) -> int:
+    """Give every live user without agents the DEFAULT_AGENTS. Returns the number of users seeded."""
+    has_agents = select(Agent.id).where(Agent.user_id == User.id).exists()
+    seeded = 0
+    while True:
+        user_ids = [row[0] for row in db.session.query(User.id).filter(User.deleted_at.is_(None), ~has_agents).limit(batch_size).all()]
+        for user_id in user_ids:
+            ensure_default_agents(user_id)
+        db.session.commit()
+        seeded += len(user_ids)
+        if len(user_ids) < batch_size:
+            return seeded
+
+
+def latest_reminders(user_id: str) -> dict:
+    """Merge the user's latest reminder results, dropping bills paid or deleted since the run."""
+    rows = AgentResult.query.filter(AgentResult.user_id == user_id, AgentResult.agent_key.like(f'{REMINDER_KEY}:%')).all()
+    due, generated_at = {}, None
+    for row in rows:
+        try:
+            payload = json.loads(row.payload)
+        except Exception:
+            continue
+        generated_at = max(generated_at or '', payload.get('generated_at') or '')
+        for item in payload.get('due', []):
+            due[item['id']] = item
+    if due:
+        current = {bill_id: next_due for bill_id, next_due in db.session.query(Bill.id, Bill.next_due).filter(Bill.id.in_(list(due)), Bill.active.isnot(False)).all()}
+        due = {bill_id: item for bill_id, item in due.items() if current.get(bill_id) and current[bill_id].isoformat() == item['next_due']}
+    return {'generated_at': generated_at, 'due': sorted(due.values(), key=lambda item: item['next_due'])}
+
+
+def claim_due_agents(now: datetime, batch_size: int, lease_seconds: int) -> list[dict]:
+    """Lease up to `batch_size` agents due at `now` to this node and return their specs.
+
+    Candidates are locked with SKIP LOCKED where the backend supports it, and
+    the lease is taken with a conditional UPDATE so only one node can win
+    an agent even on databases without row locks. Leases are measured from
+    the current clock, not `now`, so batches claimed late in a long sweep
+    are not handed out already expired. Each spec carries its lease token.
+    """
+    token = f"{NODE_ID}:{uuid.uuid4().hex[:8]}"
+    lease_now = datetime.utcnow()
+    lease_free = or_(Agent.lease_expires_at.is_(None), Agent.lease_expires_at < lease_now)
+    q = db.session.query(Agent.id).filter(Agent.enabled.is_(True), Agent.next_run_at.isnot(None), Agent.next_run_at <= now, lease_free).order_by(Agent.next_run_at.asc()).limit(batch_size)
+    if db.engine.dialect.name in ('postgresql', 'mysql'):
+        q = q.with_for_update(skip_locked=True)
+    ids = [row[0] for row in q.all()]
+    if not ids:
+        db.session.rollback()
+        return []
+    db.session.execute(update(Agent).where(Agent.id.in_(ids), lease_free).values(claimed_by=token, lease_expires_at=lease_now + timedelta(seconds=lease_seconds)).execution_options(synchronize_session=False))
+    db.session.commit()
+    rows = Agent.query.filter_by(claimed_by=token).all()
+    return [{'id': a.id, 'user_id': a.user_id, 'bill_id': a.bill_id, 'type': a.type, 'config': a.config, 'schedule': a.schedule, 'token': token} for a in rows]
+
+
+_agents = Agent.__table__
+_RESCHEDULE = (
+    update(_agents)
+    .where(_agents.c.id == bindparam('b_id'), _agents.c.claimed_by == bindparam('b_token'))
+    .values(last_run_at=bindparam('last_run_at'), next_run_at=bindparam('next_run_at'), updated_at=bindparam('updated_at'), claimed_by=None, lease_expires_at=None)
+)
+
+
+def sweep(app: Flask, now: datetime | None = None) -> int:
+    """Run every agent that is due at `now`. Returns the number of agents run."""
+    batch_size = env_int('SCHEDULER_BATCH_SIZE', 100)
+    lease_seconds = env_int('SCHEDULER_LEASE_SECONDS', 300)
+    now = now or datetime.utcnow()
+    total = 0
+    with app.app_context():
+        while True:
+            specs = claim_due_agents(now, batch_size, lease_seconds)
+            if not specs:
+                break
+            outcomes = list(_get_executor().map(lambda spec: _execute(app, spec, now), specs))
+            runs, results, agent_updates = [], [], []
+            for spec, outcome in zip(specs, outcomes):
+                runs.append({'agent_id': spec['id'], 'run_at': now, 'status': outcome['status'], 'detail': outcome['detail']})
+                for agent_key, payload, data_version in outcome['results']:
+                    results.append({'agent_key': agent_key, 'user_id': spec['user_id'], 'payload': json.dumps(payload, default=str), 'data_version': data_version, 'created_at': now})
+                agent_updates.append({'b_id': spec['id'], 'b_token': spec['token'], 'last_run_at': now, 'next_run_at': compute_next_run(spec['schedule'], now), 'updated_at': now})
+            try:
+                db.session.bulk_insert_mappings(AgentRun, runs)
+                if results:
+                    # each result replaces the previous row for its key instead of piling up
+                    db.session.execute(delete(AgentResult).where(or_(*[and_(AgentResult.agent_key == r['agent_key'], AgentResult.user_id == r['user_id']) for r in results])).execution_options(synchronize_session=False))
+                    db.session.bulk_insert_mappings(AgentResult, results)
+                # only the current lease holder may reschedule; a node whose lease was taken over leaves the agent alone
+                db.session.connection().execute(_RESCHEDULE, agent_updates)
+                db.session.commit()
+            except Exception:
+                # leases expire on their own, so the batch is retried later
+                db.session.rollback()
+                raise
+            total += len(specs)
+            if len(specs) < batch_size:
+                break
+    return total
+
+
+def prune_agent_results(app: Flask, now: datetime | None = None) -> int:
+    """Delete cached agent results of outdated data versions or older than AGENT_RESULT_TTL_HOURS.
+
+    Rows are removed in PRUNE_BATCH_SIZE batches, one short transaction each.
+    Returns the number of rows deleted.
+    """
+    batch_size = env_int('PRUNE_BATCH_SIZE', 500)
+    ttl_hours = env_int('AGENT_RESULT_TTL_HOURS', 24)
+    now = now or datetime.utcnow()
+    total = 0
+    with app.app_context():
+        current_version = select(User.data_version).where(User.id == AgentResult.user_id).scalar_subquery()
+        stale = or_(AgentResult.created_at < now - timedelta(hours=ttl_hours), AgentResult.data_version < current_version)
+        while True:
+            ids = [row[0] for row in db.session.query(AgentResult.id).filter(stale).limit(batch_size).all()]
+            if not ids:
+                db.session.rollback()
+                break
+            db.session.execute(delete(AgentResult).where(AgentResult.id.in_(ids)).execution_options(synchronize_session=False))
+            db.session.commit()
+            total += len(ids)
+            if len(ids) < batch_size:
+                break
+    return total
+
+
+def init_scheduler(app: Flask):
+    """Start the background sweep unless SCHEDULER_ENABLED is set to 0/false.
+
+    Every app instance may run a sweeper; leases keep their work disjoint.
+    """
+    if str(os.environ.get('SCHEDULER_ENABLED', '1')).lower() in ('0', 'false', 'no'):
+        return None
+    from apscheduler.schedulers.background import BackgroundScheduler
+    poll_seconds = env_int('SCHEDULER_POLL_SECONDS', 60)
+    scheduler = BackgroundScheduler(daemon=True, timezone='UTC')
+    scheduler.add_job(sweep, 'interval', seconds=poll_seconds, args=[app], id='billbot-agent-sweep', max_instances=1, coalesce=True)
+    scheduler.add_job(prune_agent_results, 'interval', seconds=poll_seconds, args=[app], id='billbot-result-prune', max_instances=1, coalesce=True)
+    scheduler.start()
+    return scheduler
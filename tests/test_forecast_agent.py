@@ -0,0 +1,98 @@
+from datetime import datetime
+
+from agents.forecast_agent import project_bills
+
+TODAY = datetime(2026, 10, 19)  # a Monday
+
+
+def _bill(**kwargs):
+    bill = {'amount_cents': 100, 'tag': 'x', 'period': 'monthly', 'interval_count': 1, 'interval_unit': 'months', 'active': True}
+    bill.update(kwargs)
+    return bill
+
+
+def _totals(bill, months=3, today=TODAY):
+    return project_bills([bill], today, months)['totals_cents']
+
+
+def test_labels_start_at_current_month():
+    assert project_bills([], TODAY, 3)['labels'] == ['2026-10', '2026-11', '2026-12']
+
+
+def test_weekly_counts_occurrences_per_month():
+    bill = _bill(period='custom', interval_unit='weeks', next_due=datetime(2026, 10, 20))
+    # Oct 20, 27 / Nov 3, 10, 17, 24 / Dec 1, 8, 15, 22, 29
+    assert _totals(bill) == [200, 400, 500]
+
+
+def test_weekly_anchor_in_the_past_includes_today():
+    bill = _bill(period='custom', interval_unit='weeks', next_due=datetime(2026, 10, 5))
+    # Oct 19, 26 / Nov 2, 9, 16, 23, 30
+    assert _totals(bill, months=2) == [200, 500]
+
+
+def test_every_two_weeks():
+    bill = _bill(period='custom', interval_unit='weeks', interval_count=2, next_due=datetime(2026, 10, 20))
+    # Oct 20 / Nov 3, 17 / Dec 1, 15, 29
+    assert _totals(bill) == [100, 200, 300]
+
+
+def test_quarterly_steps_three_months_from_anchor():
+    bill = _bill(period='3-months', next_due=datetime(2026, 8, 5))
+    assert _totals(bill, months=6) == [0, 100, 0, 0, 100, 0]
+
+
+def test_monthly_skips_current_month_when_day_has_passed():
+    assert _totals(_bill(next_due=datetime(2026, 10, 5))) == [0, 100, 100]
+    assert _totals(_bill(next_due=datetime(2026, 10, 25))) == [100, 100, 100]
+
+
+def test_anchor_later_this_month_keeps_its_real_day():
+    bill = _bill(next_due=datetime(2026, 10, 30))
+    assert _totals(bill, today=datetime(2026, 10, 29)) == [100, 100, 100]
+    assert _totals(bill, today=datetime(2026, 10, 30)) == [100, 100, 100]
+    assert _totals(_bill(period='3-months', next_due=datetime(2026, 10, 31)), today=datetime(2026, 10, 29)) == [100, 0, 0]
+
+
+def test_monthly_interval_count():
+    bill = _bill(interval_count=2, next_due=datetime(2026, 9, 25))
+    assert _totals(bill, months=4) == [0, 100, 0, 100]
+
+
+def test_yearly_anchor_in_the_future_counts_once():
+    bill = _bill(period='yearly', next_due=datetime(2027, 3, 10))
+    totals = _totals(bill, months=12)
+    assert totals[5] == 100
+    assert sum(totals) == 100
+
+
+def test_yearly_interval_count_skips_years():
+    bill = _bill(period='yearly', interval_count=2, next_due=datetime(2025, 11, 1))
+    assert sum(_totals(bill, months=12)) == 0
+
+
+def test_day_is_clamped_to_28():
+    bill = _bill(next_due=datetime(2026, 1, 31))
+    assert _totals(bill) == [100, 100, 100]
+    # the clamped Oct 28 occurrence is already past on Oct 30
+    assert _totals(bill, today=datetime(2026, 10, 30)) == [0, 100, 100]
+
+
+def test_one_time_only_inside_horizon():
+    assert _totals(_bill(period='one-time', next_due=datetime(2026, 11, 2))) == [0, 100, 0]
+    assert _totals(_bill(period='one-time', next_due=datetime(2027, 2, 1))) == [0, 0, 0]
+    assert _totals(_bill(period='one-time', next_due=datetime(2026, 10, 1))) == [0, 0, 0]
+
+
+def test_inactive_and_unanchored_bills_are_skipped():
+    bills = [_bill(active=False, next_due=datetime(2026, 11, 1)), _bill(next_due=None)]
+    forecast = project_bills(bills, TODAY, 3)
+    assert forecast['totals_cents'] == [0, 0, 0]
+    assert forecast['by_tag_cents'] == {}
+
+
+def test_by_tag_and_occurrences():
+    bills = [_bill(tag='rent', next_due=datetime(2026, 10, 25)), _bill(tag='gym', amount_cents=50, period='custom', interval_unit='weeks', next_due=datetime(2026, 10, 20))]
+    forecast = project_bills(bills, TODAY, 1)
+    assert forecast['by_tag_cents'] == {'rent': [100], 'gym': [100]}
+    assert forecast['occurrences'] == 3